@@ -3,7 +3,7 @@
 """
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, cars, additional_services, booking
+from app.api.v1.endpoints import auth, cars, additional_services, booking, system
 
 api_router = APIRouter()
 
@@ -12,3 +12,4 @@ api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(cars.router, prefix="/cars", tags=["cars"])
 api_router.include_router(additional_services.router, prefix="/additional-services", tags=["additional-services"])
 api_router.include_router(booking.router, prefix="/booking", tags=["booking"])
+api_router.include_router(system.router, prefix="/system", tags=["system"])
@@ -4,63 +4,91 @@ API эндпоинты для аутентификации - исправлен
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import get_async_db, get_async_read_db
 from app.core.config import settings
-from app.services.auth import AuthService
+from app.core.rate_limit import login_ip_limiter, login_user_limiter
+from app.services.auth import AsyncAuthService, revoked_access_tokens
+from app.services.password import PasswordHasherBusy
 from app.schemas.user import UserCreate, UserLogin, AuthResponse, TokenResponse, User
 
 router = APIRouter()
 security = HTTPBearer()
 
 
-def get_auth_service(db: Session = Depends(get_db)) -> AuthService:
+def get_auth_service(db: AsyncSession = Depends(get_async_db)) -> AsyncAuthService:
     """Получение сервиса аутентификации"""
-    return AuthService(db)
+    return AsyncAuthService(db)
 
 
-def get_current_user(
+def get_read_auth_service(db: AsyncSession = Depends(get_async_read_db)) -> AsyncAuthService:
+    """Получение сервиса аутентификации на соединении только для чтения"""
+    return AsyncAuthService(db)
+
+
+def get_token_payload(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    auth_service: AuthService = Depends(get_auth_service)
-) -> User:
-    """Получение текущего пользователя из токена"""
-    token = credentials.credentials
-    payload = auth_service.verify_token(token)
+    auth_service: AsyncAuthService = Depends(get_read_auth_service)
+) -> dict:
+    """Проверенный payload access токена (подпись, exp и отзыв — без запроса к БД)"""
+    payload = auth_service.verify_token(credentials.credentials)
     
-    if payload is None:
+    if payload is None or payload.get("sub") is None or revoked_access_tokens.is_revoked(payload.get("jti")):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный токен",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user_id = payload.get("sub")
-    if user_id is None:
+    return payload
+
+
+async def get_current_user(
+    payload: dict = Depends(get_token_payload),
+    auth_service: AsyncAuthService = Depends(get_read_auth_service)
+) -> User:
+    """Получение текущего пользователя из токена"""
+    user_id = payload["sub"]
+    user = await auth_service.get_principal(int(user_id))
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Неверный токен",
+            detail="Пользователь не найден",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = auth_service.get_user_by_id(int(user_id))
-    if user is None:
+    if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Пользователь не найден",
+            detail="Пользователь деактивирован",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
     return user
 
 
-@router.post("/login", response_model=AuthResponse)
+@router.post("/login", response_model=AuthResponse, dependencies=[Depends(login_ip_limiter.by_ip())])
 async def login(
     login_data: UserLogin,
-    auth_service: AuthService = Depends(get_auth_service)
+    auth_service: AsyncAuthService = Depends(get_read_auth_service),
+    writer_auth_service: AsyncAuthService = Depends(get_auth_service)
 ):
-    """Вход пользователя"""
-    user = auth_service.authenticate_user(login_data)
+    """Вход пользователя.
+
+    Пользователь ищется и проверяется на соединении для чтения; соединение-писатель
+    берется только на запись refresh токена (и пересчитанного хеша пароля).
+    """
+    # Лимит по имени пользователя — до проверки пароля (bcrypt)
+    await login_user_limiter.hit(f"user:{login_data.username.lower()}")
+    try:
+        user = await auth_service.authenticate_user(login_data)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервер перегружен, повторите попытку позже",
+            headers={"Retry-After": "1"},
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -74,8 +102,11 @@ async def login(
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     
+    # Хеш со старой стоимостью bcrypt пересчитывается до транзакции записи
+    password_hash = await auth_service.rehash_password(user, login_data.password)
+    
     # Создаем refresh токен
-    refresh_token = auth_service.create_refresh_token(user.id)
+    refresh_token = await writer_auth_service.create_refresh_token(user.id, password_hash=password_hash)
     
     # Возвращаем оба токена в ответе (без cookies)
     return AuthResponse(
@@ -88,7 +119,7 @@ async def login(
 @router.post("/refresh", response_model=TokenResponse)
 async def refresh_token(
     refresh_data: dict,
-    auth_service: AuthService = Depends(get_auth_service)
+    auth_service: AsyncAuthService = Depends(get_auth_service)
 ):
     """Обновление access токена"""
     # Получаем refresh токен из тела запроса
@@ -99,23 +130,21 @@ async def refresh_token(
             detail="Refresh токен не найден"
         )
     
-    # Проверяем refresh токен
-    user = auth_service.verify_refresh_token(refresh_token)
-    if not user:
+    # Проверяем, отзываем и выпускаем новый refresh токен одной транзакцией
+    rotated = await auth_service.rotate_refresh_token(refresh_token)
+    if rotated is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный или истекший refresh токен"
         )
+    user_id, new_refresh_token = rotated
     
     # Создаем новый access токен
     access_token = auth_service.create_access_token(
-        data={"sub": str(user.id)},
+        data={"sub": str(user_id)},
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     
-    # Создаем новый refresh токен
-    new_refresh_token = auth_service.create_refresh_token(user.id)
-    
     # Возвращаем оба токена в ответе (без cookies)
     return TokenResponse(
         token=access_token,
@@ -126,11 +155,16 @@ async def refresh_token(
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
 async def logout(
     current_user: User = Depends(get_current_user),
-    auth_service: AuthService = Depends(get_auth_service)
+    payload: dict = Depends(get_token_payload),
+    auth_service: AsyncAuthService = Depends(get_auth_service)
 ):
     """Выход пользователя"""
     # Отзываем все refresh токены пользователя
-    auth_service.revoke_all_user_tokens(current_user.id)
+    await auth_service.revoke_all_user_tokens(current_user.id)
+    
+    # Отзываем текущий access токен до истечения его срока
+    if payload.get("jti"):
+        revoked_access_tokens.revoke(payload["jti"], payload["exp"])
     
     # Возвращаем успешный статус (cookies больше не используются)
 
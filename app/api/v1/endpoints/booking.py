@@ -4,11 +4,13 @@
 from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.services.car import CarService
-from app.models.car import Car
+from app.core.database import get_async_read_db
+from app.core.rate_limit import booking_ip_limiter
+from app.services.car import AsyncCarService
+from app.services.additional_service import AsyncAdditionalServiceService
+from app.schemas.car import Car
 from app.models.additional_service import AdditionalService
 
 
@@ -56,14 +58,14 @@ def _parse_days(pickup_date: str, return_date: str) -> int:
     return max(1, diff.days)
 
 
-@router.post("/", response_model=BookingResponse)
-def create_booking(
+@router.post("/", response_model=BookingResponse, dependencies=[Depends(booking_ip_limiter.by_ip())])
+async def create_booking(
     data: BookingRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
 ):
     """Рассчитать стоимость, собрать текст и вернуть ссылку WhatsApp"""
-    car_service = CarService(db)
-    car: Optional[Car] = car_service.get_car_by_id(data.car_id)
+    car_service = AsyncCarService(db)
+    car: Optional[Car] = await car_service.get_car_by_id(data.car_id)
     if not car:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Автомобиль не найден")
 
@@ -93,11 +95,7 @@ def create_booking(
     additional_total = 0
     selected_ids = data.additional_service_ids or []
     if selected_ids:
-        additional_services = (
-            db.query(AdditionalService)
-            .filter(AdditionalService.service_id.in_(selected_ids))
-            .all()
-        )
+        additional_services = await AsyncAdditionalServiceService.get_services_by_service_ids(db, selected_ids)
         for s in additional_services:
             if not s.is_active:
                 continue
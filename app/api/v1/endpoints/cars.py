@@ -1,23 +1,31 @@
 """
 API эндпоинты для автомобилей
 """
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
-
-from app.core.database import get_db
-from app.services.car import CarService
-from app.services.storage import StorageService
-from app.schemas.car import Car, CarCreate, CarUpdate, UploadResponse, CleanupResponse
+from typing import List, Dict, Any, Optional, Literal
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Form, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal, get_async_db, get_async_read_db
+from app.core.etag import conditional_get, etag_headers
+from app.core.responses import RawJSONResponse
+from app.core.executors import file_io_bulkhead
+from app.services.car import AsyncCarService
+from app.services.storage import StorageService, FileUploadError
+from app.schemas.car import Car, CarCreate, CarUpdate, CarListItem, CarListQuery, UploadResponse, CleanupResponse
 from app.api.v1.endpoints.auth import get_current_user
 from app.schemas.user import User
 
 router = APIRouter()
 
 
-def get_car_service(db: Session = Depends(get_db)) -> CarService:
+def get_car_service(db: AsyncSession = Depends(get_async_db)) -> AsyncCarService:
     """Получение сервиса автомобилей"""
-    return CarService(db)
+    return AsyncCarService(db)
+
+
+def get_car_read_service(db: AsyncSession = Depends(get_async_read_db)) -> AsyncCarService:
+    """Получение сервиса автомобилей на соединении только для чтения"""
+    return AsyncCarService(db)
 
 
 def get_storage_service() -> StorageService:
@@ -25,67 +33,126 @@ def get_storage_service() -> StorageService:
     return StorageService()
 
 
-@router.get("/", response_model=List[Car])
+async def build_image_variants(car_id: int, public_paths: List[str]) -> None:
+    """Фоновое создание уменьшенных копий изображений после ответа клиенту"""
+    storage_service = StorageService()
+    variants = await storage_service.generate_variants(public_paths)
+    if not variants:
+        return
+    
+    async with AsyncSessionLocal() as db:
+        unused = await AsyncCarService(db).set_image_variants(car_id, variants)
+    
+    # Изображение успели удалить, пока создавались копии
+    if unused:
+        await file_io_bulkhead.run(storage_service.delete_variants, unused)
+
+
+@router.get("/", response_model=List[CarListItem], response_class=RawJSONResponse)
 async def get_cars(
-    car_service: CarService = Depends(get_car_service)
+    fuel_type: Optional[str] = None,
+    category: Optional[str] = None,
+    available: Optional[bool] = None,
+    min_price: Optional[int] = Query(None, ge=0),
+    max_price: Optional[int] = Query(None, ge=0),
+    sort_by: Optional[Literal["price", "rating", "created_at"]] = None,
+    order: Literal["asc", "desc"] = "asc",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    etag: str = Depends(conditional_get("cars")),
+    car_service: AsyncCarService = Depends(get_car_read_service)
 ):
-    """Получение списка всех автомобилей"""
-    cars = car_service.get_cars()
-    return cars
+    """Получение списка автомобилей с фильтрами и постраничной выдачей.
+
+    Возвращает облегченные карточки; полные данные — в GET /cars/{id}.
+    Без limit и cursor возвращается весь список, как и раньше; с ними —
+    страница, а курсор следующей возвращается в заголовке X-Next-Cursor.
+    """
+    query = CarListQuery(
+        fuel_type=fuel_type,
+        category=category,
+        available=available,
+        min_price=min_price,
+        max_price=max_price,
+        sort_by=sort_by,
+        order=order,
+        cursor=cursor,
+        limit=limit,
+    )
+    try:
+        page = await car_service.get_cars_page(query)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    headers = etag_headers(etag)
+    if page.next_cursor:
+        headers["X-Next-Cursor"] = page.next_cursor
+    return RawJSONResponse(page.content, headers=headers)
 
 
-@router.get("/meta")
+@router.get("/meta", dependencies=[Depends(conditional_get("cars"))])
 async def get_cars_meta(
-    car_service: CarService = Depends(get_car_service)
+    car_service: AsyncCarService = Depends(get_car_read_service)
 ) -> Dict[str, Any]:
     """Агрегированные данные для фильтров (типы топлива, диапазон цен)"""
-    return car_service.get_meta()
+    return await car_service.get_meta()
 
 
-@router.get("/popular", response_model=List[Car])
+@router.get("/popular", response_model=List[Car], response_class=RawJSONResponse)
 async def get_popular_cars(
     limit: int = 8,
-    car_service: CarService = Depends(get_car_service)
+    etag: str = Depends(conditional_get("cars")),
+    car_service: AsyncCarService = Depends(get_car_read_service)
 ):
     """Популярные автомобили по рейтингу"""
-    return car_service.get_popular(limit=limit)
+    content = await car_service.get_popular_json(limit=limit)
+    return RawJSONResponse(content, headers=etag_headers(etag))
 
 
-@router.get("/{car_id}", response_model=Car)
+@router.get("/{car_id}", response_model=Car, response_class=RawJSONResponse)
 async def get_car(
     car_id: int,
-    car_service: CarService = Depends(get_car_service)
+    etag: str = Depends(conditional_get("cars")),
+    car_service: AsyncCarService = Depends(get_car_read_service)
 ):
     """Получение автомобиля по ID"""
-    car = car_service.get_car_by_id(car_id)
-    if not car:
+    content = await car_service.get_car_json(car_id)
+    if content is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Автомобиль не найден"
         )
-    return car
+    return RawJSONResponse(content, headers=etag_headers(etag))
 
 
 @router.post("/", response_model=Car, status_code=status.HTTP_201_CREATED)
 async def create_car(
     car_data: CarCreate,
-    car_service: CarService = Depends(get_car_service),
+    background_tasks: BackgroundTasks,
+    car_service: AsyncCarService = Depends(get_car_service),
     storage_service: StorageService = Depends(get_storage_service),
     current_user: User = Depends(get_current_user)
 ):
     """Создание нового автомобиля"""
     try:
         # Создаем автомобиль
-        car = car_service.create_car(car_data)
+        car = await car_service.create_car(car_data)
         
         # Если есть временные изображения, перемещаем их
         if car_data.images:
             temp_images = [img for img in car_data.images if "/uploads/temp/" in img]
             if temp_images:
-                moved_images = storage_service.move_temp_to_car(car.id, temp_images)
+                moved_images = await file_io_bulkhead.run(storage_service.move_temp_to_car, car.id, temp_images)
                 # Обновляем изображения автомобиля
-                car_service.update_car_images(car.id, moved_images)
-                car = car_service.get_car_by_id(car.id)
+                car = await car_service.update_car_images(car.id, moved_images)
+                background_tasks.add_task(build_image_variants, car.id, moved_images)
+        
+        # Изображения, уже загруженные для других автомобилей, тоже получают
+        # ссылку от нового: иначе их удалят вместе с последним прежним владельцем
+        if car.images:
+            await file_io_bulkhead.run(storage_service.sync_car_refs, car.id, car.images)
         
         return car
         
@@ -101,45 +168,57 @@ async def create_car(
 async def update_car(
     car_id: int,
     car_data: CarUpdate,
-    car_service: CarService = Depends(get_car_service),
+    car_service: AsyncCarService = Depends(get_car_service),
+    storage_service: StorageService = Depends(get_storage_service),
     current_user: User = Depends(get_current_user)
 ):
     """Обновление автомобиля"""
-    car = car_service.update_car(car_id, car_data)
+    car = await car_service.update_car(car_id, car_data)
     if not car:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Автомобиль не найден"
         )
+    
+    # Ссылки на файлы в хранилище по содержимому следуют за списком изображений
+    if car_data.images is not None:
+        await file_io_bulkhead.run(storage_service.sync_car_refs, car_id, car.images or [])
     return car
 
 
 @router.delete("/{car_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_car(
     car_id: int,
-    car_service: CarService = Depends(get_car_service),
+    car_service: AsyncCarService = Depends(get_car_service),
+    storage_service: StorageService = Depends(get_storage_service),
     current_user: User = Depends(get_current_user)
 ):
     """Удаление автомобиля"""
-    success = car_service.delete_car(car_id)
+    success = await car_service.delete_car(car_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Автомобиль не найден"
         )
+    
+    # Снимаем ссылки автомобиля; файлы, которые больше никому не нужны, удаляются
+    await file_io_bulkhead.run(storage_service.sync_car_refs, car_id, [])
 
 
 @router.post("/{car_id}/images", response_model=UploadResponse)
 async def upload_car_images(
     car_id: int,
+    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...),
-    car_service: CarService = Depends(get_car_service),
+    car_service: AsyncCarService = Depends(get_car_service),
+    car_read_service: AsyncCarService = Depends(get_car_read_service),
     storage_service: StorageService = Depends(get_storage_service),
     current_user: User = Depends(get_current_user)
 ):
     """Загрузка изображений для автомобиля"""
-    # Проверяем, что автомобиль существует
-    car = car_service.get_car_by_id(car_id)
+    # Проверяем, что автомобиль существует (на чтении: соединение-писатель
+    # не должно быть занято, пока пишутся файлы)
+    car = await car_read_service.get_car_by_id(car_id)
     if not car:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -152,21 +231,24 @@ async def upload_car_images(
             detail="Файлы не предоставлены"
         )
     
-    uploaded_paths = []
-    for file in files:
-        try:
-            path = storage_service.save_file(car_id, file)
-            uploaded_paths.append(path)
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Ошибка загрузки файла {file.filename}: {str(e)}"
-            )
+    try:
+        uploaded_paths = await storage_service.save_files(files, car_id=car_id)
+    except FileUploadError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
-    # Обновляем список изображений автомобиля
-    current_images = car.images or []
-    new_images = current_images + uploaded_paths
-    car_service.update_car_images(car_id, new_images)
+    # Добавляем все изображения автомобиля одной записью
+    if await car_service.append_car_images(car_id, uploaded_paths) is None:
+        await file_io_bulkhead.run(storage_service.release_car_files, car_id, uploaded_paths)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Автомобиль не найден"
+        )
+    
+    # Уменьшенные копии создаются в пуле процессов уже после ответа
+    background_tasks.add_task(build_image_variants, car_id, uploaded_paths)
     
     return UploadResponse(uploaded=uploaded_paths)
 
@@ -184,16 +266,13 @@ async def upload_temp_files(
             detail="Файлы не предоставлены"
         )
     
-    uploaded_paths = []
-    for file in files:
-        try:
-            path = storage_service.save_temp_file(file)
-            uploaded_paths.append(path)
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Ошибка загрузки файла {file.filename}: {str(e)}"
-            )
+    try:
+        uploaded_paths = await storage_service.save_files(files)
+    except FileUploadError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     return UploadResponse(uploaded=uploaded_paths)
 
@@ -211,17 +290,17 @@ async def cleanup_uploads(
             detail="Пути не предоставлены"
         )
     
-    deleted_count = storage_service.delete_by_public_paths(paths)
+    deleted_count = await file_io_bulkhead.run(storage_service.delete_by_public_paths, paths)
     return CleanupResponse(deleted=deleted_count)
 
 
 @router.get("/{car_id}/services")
 async def get_car_services(
     car_id: int,
-    car_service: CarService = Depends(get_car_service)
+    car_service: AsyncCarService = Depends(get_car_read_service)
 ) -> List[dict]:
     """Получить активные дополнительные услуги, доступные для автомобиля"""
-    services = car_service.get_car_services(car_id)
+    services = await car_service.get_car_services(car_id)
     # Возвращаем как словари для совместимости
     return [
         {
@@ -0,0 +1,38 @@
+"""
+Служебные эндпоинты: метрики процесса
+"""
+from typing import Dict, Any
+from fastapi import APIRouter, Depends
+
+from app.core.executors import get_executor_stats
+from app.core.rate_limit import get_rate_limit_stats
+from app.core.tasks import get_task_stats
+from app.services.auth import principal_cache, verified_token_cache, refresh_rotation_cache, revoked_access_tokens
+from app.services.password import password_hasher
+from app.services.car import catalog_cache, car_cache, serialized_cache
+from app.api.v1.endpoints.auth import get_current_user
+from app.schemas.user import User
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_metrics(
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Метрики пулов блокирующих операций, кешей и фоновых задач (требует авторизации)"""
+    return {
+        "executors": get_executor_stats(),
+        "password_hasher": password_hasher.stats(),
+        "tasks": get_task_stats(),
+        "rate_limits": get_rate_limit_stats(),
+        "revoked_access_tokens": revoked_access_tokens.stats(),
+        "caches": {
+            catalog_cache.name: catalog_cache.stats(),
+            car_cache.name: car_cache.stats(),
+            serialized_cache.name: serialized_cache.stats(),
+            principal_cache.name: principal_cache.stats(),
+            verified_token_cache.name: verified_token_cache.stats(),
+            refresh_rotation_cache.name: refresh_rotation_cache.stats(),
+        },
+    }
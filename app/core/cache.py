@@ -0,0 +1,93 @@
+"""
+Внутрипроцессный кеш с ограничением размера и времени жизни
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """LRU-кеш с TTL, версией и счетчиками попаданий"""
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def version(self) -> int:
+        """Версия кеша; увеличивается при каждой инвалидации"""
+        return self._version
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Получение значения; None если записи нет или она устарела"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None, ttl: Optional[float] = None) -> bool:
+        """Сохранение значения.
+
+        Если передана версия, прочитанная до запроса к БД, и с тех пор кеш
+        инвалидировали, значение не сохраняется, чтобы не закешировать
+        устаревшие данные.
+        """
+        expires_at = time.monotonic() + (self.ttl_seconds if ttl is None else ttl)
+        with self._lock:
+            if version is not None and version != self._version:
+                return False
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._evictions += 1
+            return True
+
+    def invalidate(self, key: Hashable) -> None:
+        """Удаление одной записи"""
+        with self._lock:
+            self._data.pop(key, None)
+            self._version += 1
+            self._invalidations += 1
+
+    def clear(self) -> None:
+        """Удаление всех записей"""
+        with self._lock:
+            self._data.clear()
+            self._version += 1
+            self._invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики кеша"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "version": self._version,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
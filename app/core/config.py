@@ -17,11 +17,27 @@ class Settings(BaseSettings):
     # База данных
     DATABASE_URL: str = "sqlite:///./baz_car.db"
     
+    # Профиль SQLite: WAL, прагмы и разделение чтения/записи
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # 256MB
+    SQLITE_CACHE_SIZE_KB: int = 20000
+    SQLITE_READ_POOL_SIZE: int = 8
+    
     # JWT настройки
     JWT_SECRET_KEY: str = "your-secret-key-change-in-production"
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    REFRESH_TOKEN_REAPER_INTERVAL_SECONDS: int = 3600
+    REFRESH_TOKEN_REAPER_BATCH_SIZE: int = 500
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: int = 10
+    
+    # Кеш пользователей для авторизации запросов
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 1024
+    TOKEN_CACHE_MAX_ENTRIES: int = 4096
     
     # CORS настройки - исправлено для продакшена
     ALLOWED_HOSTS: List[str] = [
@@ -45,6 +61,47 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "uploads"
     TEMP_UPLOAD_DIR: str = "uploads/temp"
     MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1MB — размер куска при потоковой записи загрузок
+    UPLOAD_CONCURRENCY: int = 4  # Сколько файлов одной загрузки пишется одновременно
+    TEMP_UPLOAD_TTL_SECONDS: int = 24 * 3600  # Временные загрузки старше этого удаляются
+    TEMP_UPLOAD_SWEEP_INTERVAL_SECONDS: int = 900
+    TEMP_UPLOAD_SWEEP_BATCH_SIZE: int = 500  # Сколько записей каталога просматривается за один заход в пул
+    UPLOADS_CACHE_MAX_AGE: int = 365 * 24 * 3600  # Cache-Control для /uploads (имена файлов не переиспользуются)
+    
+    # Производные изображения (уменьшенные копии для srcset, нужен Pillow)
+    IMAGE_VARIANTS_ENABLED: bool = True
+    IMAGE_VARIANT_WIDTHS: List[int] = [320, 800, 1600]
+    IMAGE_WEBP_QUALITY: int = 80
+    IMAGE_JPEG_QUALITY: int = 82
+    IMAGE_WORKERS: int = 2
+    
+    # Пулы потоков для блокирующих операций
+    FILE_IO_WORKERS: int = 4
+    
+    # Пул хеширования паролей (bcrypt)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    PASSWORD_HASH_USE_PROCESSES: bool = False
+    PASSWORD_HASH_ROUNDS: int = 0  # 0 — подобрать при запуске под PASSWORD_HASH_TARGET_MS
+    PASSWORD_HASH_TARGET_MS: int = 250
+    PASSWORD_HASH_MIN_ROUNDS: int = 10
+    PASSWORD_HASH_MAX_ROUNDS: int = 14
+    PASSWORD_HASH_CALIBRATION_FILE: str = "password_hash_rounds.json"  # Подобранная стоимость; "" — подбирать при каждом запуске
+    
+    # Ограничение частоты запросов (формат "N/second|minute|hour|day")
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_LOGIN_IP: str = "10/minute"
+    RATE_LIMIT_LOGIN_USER: str = "5/minute"
+    RATE_LIMIT_BOOKING_IP: str = "20/minute"
+    RATE_LIMIT_TRUST_FORWARDED: bool = False
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_STORE_PATH: str = ""  # Путь к SQLite файлу для общих счетчиков нескольких воркеров
+    
+    # Кеш каталога автомобилей
+    CATALOG_CACHE_TTL_SECONDS: int = 300
+    CATALOG_CACHE_MAX_ENTRIES: int = 1024
+    SERIALIZED_CACHE_MAX_ENTRIES: int = 4096
+    ETAG_DB_CHECK_INTERVAL_SECONDS: float = 2.0  # Как часто сверять ETag с маркером изменений в БД
     
     # Порт сервера
     PORT: int = 8080
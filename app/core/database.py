@@ -1,22 +1,101 @@
 """
 Настройка базы данных
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
 from app.core.config import settings
 
+IS_SQLITE = "sqlite" in settings.DATABASE_URL
+
+
+def _get_async_database_url(database_url: str) -> str:
+    """Преобразование URL базы данных в URL для асинхронного драйвера"""
+    if database_url.startswith("sqlite:///"):
+        return database_url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    if database_url.startswith("postgresql://"):
+        return database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return database_url
+
+
+def _sqlite_pragmas(read_only: bool) -> list:
+    """Прагмы SQLite, применяемые к каждому новому соединению"""
+    pragmas = [
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    else:
+        pragmas.extend([
+            f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+            f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        ])
+    return pragmas
+
+
+def _install_sqlite_pragmas(sync_engine, read_only: bool = False) -> None:
+    """Регистрация прагм SQLite на событие подключения"""
+    pragmas = _sqlite_pragmas(read_only)
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+_connect_args = {"check_same_thread": False} if IS_SQLITE else {}
+
 # Создаем движок базы данных
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    connect_args=_connect_args
 )
 
 # Создаем фабрику сессий
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок для записи: в SQLite одно соединение-писатель,
+# поэтому изменения из админки выполняются строго последовательно
+async_engine = create_async_engine(
+    _get_async_database_url(settings.DATABASE_URL),
+    connect_args=_connect_args,
+    **({"pool_size": 1, "max_overflow": 0} if IS_SQLITE else {})
+)
+
+# Асинхронный движок только для чтения (GET эндпоинты)
+async_read_engine = create_async_engine(
+    _get_async_database_url(settings.DATABASE_URL),
+    connect_args=_connect_args,
+    **({"pool_size": settings.SQLITE_READ_POOL_SIZE, "max_overflow": 0} if IS_SQLITE else {})
+)
+
+if IS_SQLITE:
+    _install_sqlite_pragmas(engine)
+    _install_sqlite_pragmas(async_engine.sync_engine)
+    _install_sqlite_pragmas(async_read_engine.sync_engine, read_only=True)
+
+# Фабрики асинхронных сессий; объекты остаются доступными после commit
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=async_read_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # Базовый класс для моделей
 Base = declarative_base()
 
@@ -30,6 +109,18 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Получение асинхронной сессии базы данных (соединение-писатель)"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """Получение асинхронной сессии только для чтения"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
 async def init_db():
     """Инициализация базы данных"""
     # Импортируем все модели для создания таблиц
@@ -39,4 +130,12 @@ async def init_db():
     from app.models.additional_service import AdditionalService
     
     # Создаем все таблицы
-    Base.metadata.create_all(bind=engine)
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def close_db():
+    """Закрытие соединений с базой данных"""
+    await async_read_engine.dispose()
+    await async_engine.dispose()
+    engine.dispose()
@@ -0,0 +1,124 @@
+"""
+Версии данных и условные запросы (ETag / If-None-Match)
+"""
+import hashlib
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_async_read_db
+
+# Идентификатор процесса: версии начинаются заново после перезапуска,
+# поэтому ETag прошлого процесса не должен совпасть с новым
+_BOOT_ID = uuid.uuid4().hex
+
+
+class DataVersion:
+    """Счетчики версий данных по областям (автомобили, услуги).
+
+    Счетчик увеличивают сервисы приложения при записи. Изменения в обход
+    приложения (create_user.py, скрипты импорта, миграции) замечаются по
+    маркеру в БД — например, max(updated_at) и числу строк, — который
+    сверяется не чаще раза в ETAG_DB_CHECK_INTERVAL_SECONDS. Правка в обход
+    приложения, не меняющая ни updated_at, ни число строк, не заметна.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self._markers: Dict[str, Tuple[Any, Optional[Callable[[], None]]]] = {}
+        self._seen_markers: Dict[str, Tuple[Any, ...]] = {}
+        self._next_check: Dict[str, float] = {}
+
+    def get(self, scope: str) -> int:
+        """Текущая версия области"""
+        return self._versions.get(scope, 0)
+
+    def bump(self, scope: str) -> int:
+        """Увеличение версии после изменения данных"""
+        with self._lock:
+            self._versions[scope] = self._versions.get(scope, 0) + 1
+            return self._versions[scope]
+
+    def register_marker(self, scope: str, statement: Any, on_change: Optional[Callable[[], None]] = None) -> None:
+        """SQL-запрос маркера области (одна строка) и сброс кешей при его изменении"""
+        self._markers[scope] = (statement, on_change)
+
+    async def sync(self, scope: str, db: AsyncSession) -> None:
+        """Сверка маркера в БД: изменился — новая версия области и сброс ее кешей"""
+        registered = self._markers.get(scope)
+        if registered is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_check.get(scope, 0.0):
+                return
+            self._next_check[scope] = now + settings.ETAG_DB_CHECK_INTERVAL_SECONDS
+        
+        statement, on_change = registered
+        marker = tuple((await db.execute(statement)).one())
+        with self._lock:
+            previous = self._seen_markers.get(scope)
+            self._seen_markers[scope] = marker
+        if previous is not None and previous != marker:
+            if on_change is not None:
+                on_change()
+            self.bump(scope)
+
+
+data_version = DataVersion()
+
+
+def make_etag(scope: str, request: Request) -> str:
+    """Строгий ETag: версия данных области + путь и параметры запроса"""
+    key = f"{_BOOT_ID}:{scope}:{data_version.get(scope)}:{request.url.path}?{request.url.query}"
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверка заголовка If-None-Match (слабое сравнение по RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    """Заголовки кеширования для ответа с ETag"""
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def conditional_get(scope: str) -> Callable[..., Any]:
+    """Зависимость для GET эндпоинтов: ETag в ответе и 304 без чтения самих данных.
+
+    Из БД читается только маркер области (см. DataVersion). Эндпоинты,
+    возвращающие Response напрямую, должны сами передать заголовки из
+    etag_headers(), так как FastAPI не переносит их из зависимости.
+    """
+
+    async def check_etag(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_async_read_db)
+    ) -> str:
+        await data_version.sync(scope, db)
+        etag = make_etag(scope, request)
+        headers = etag_headers(etag)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        return etag
+
+    return check_etag
@@ -0,0 +1,168 @@
+"""
+Изолированные пулы потоков (bulkheads) для блокирующей работы
+и пулы процессов для CPU-тяжелой работы
+"""
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class Bulkhead:
+    """Ограниченный пул потоков для одного класса блокирующих операций"""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"bulkhead-{name}")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _call(self, submitted_at: float, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Выполнение задачи в потоке пула с учетом метрик"""
+        wait = time.monotonic() - submitted_at
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Выполнение блокирующей функции в пуле без блокировки event loop"""
+        with self._lock:
+            self._queued += 1
+            self._submitted += 1
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self._call, time.monotonic(), func, *args, **kwargs)
+        return await loop.run_in_executor(self._executor, call)
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики пула: глубина очереди и время ожидания"""
+        with self._lock:
+            started = self._submitted - self._queued
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self._queued,
+                "active": self._active,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_ms": round(self._total_wait / started * 1000, 3) if started else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+            }
+
+    def shutdown(self) -> None:
+        """Остановка пула"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ProcessPool:
+    """Пул процессов для CPU-тяжелых задач; процессы запускаются при первой задаче"""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_duration = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Выполнение функции (должна быть picklable) в процессе пула"""
+        executor = self._get_executor()
+        with self._lock:
+            self._submitted += 1
+            self._in_flight += 1
+        started_at = time.monotonic()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+                self._total_duration += time.monotonic() - started_at
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики пула: задачи в работе и среднее время выполнения"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "started": self._executor is not None,
+                "in_flight": self._in_flight,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_duration_ms": round(self._total_duration / self._completed * 1000, 3) if self._completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        """Остановка пула"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Файловые операции (сохранение, перемещение и удаление загрузок)
+file_io_bulkhead = Bulkhead("file_io", settings.FILE_IO_WORKERS)
+
+# Обработка изображений (уменьшенные копии, WebP)
+image_process_pool = ProcessPool("images", settings.IMAGE_WORKERS)
+
+BULKHEADS: Dict[str, Bulkhead] = {
+    file_io_bulkhead.name: file_io_bulkhead,
+}
+
+PROCESS_POOLS: Dict[str, ProcessPool] = {
+    image_process_pool.name: image_process_pool,
+}
+
+
+def get_executor_stats() -> Dict[str, Dict[str, Any]]:
+    """Метрики всех пулов"""
+    stats = {name: bulkhead.stats() for name, bulkhead in BULKHEADS.items()}
+    stats.update({name: pool.stats() for name, pool in PROCESS_POOLS.items()})
+    return stats
+
+
+def shutdown_executors() -> None:
+    """Остановка всех пулов при завершении приложения"""
+    for bulkhead in BULKHEADS.values():
+        bulkhead.shutdown()
+    for pool in PROCESS_POOLS.values():
+        pool.shutdown()
@@ -0,0 +1,200 @@
+"""
+Ограничение частоты запросов (token bucket) для дорогих публичных эндпоинтов
+"""
+import abc
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+from app.core.executors import file_io_bulkhead
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """Разбор лимита вида "5/minute" -> (емкость корзины, период в секундах)"""
+    count, _, period = rate.partition("/")
+    if period not in _PERIODS:
+        raise ValueError(f"Неверный формат лимита: {rate}")
+    return int(count), float(_PERIODS[period])
+
+
+class RateLimitStore(abc.ABC):
+    """Хранилище корзин токенов.
+
+    take() атомарно списывает один токен и возвращает 0, если запрос
+    разрешен, иначе — сколько секунд ждать до следующего токена.
+    Хранилища с blocking = True вызываются вне event loop.
+    """
+
+    blocking = False
+
+    @abc.abstractmethod
+    def take(self, key: str, capacity: int, period: float) -> float:
+        """Списание токена из корзины key"""
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """Корзины в памяти процесса (один воркер uvicorn)"""
+
+    def __init__(self, max_keys: int):
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: str, capacity: int, period: float) -> float:
+        rate = capacity / period
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(capacity), now))
+            tokens = min(float(capacity), tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            # Самые давно не использованные ключи вытесняются первыми
+            while len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """Корзины в локальном SQLite файле: счетчики общие для нескольких воркеров.
+
+    take() ждет блокировку файла до секунды, поэтому выполняется в пуле файловых операций.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def take(self, key: str, capacity: int, period: float) -> float:
+        rate = capacity / period
+        # Время стены: monotonic у разных процессов не сравнимо
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                row = cursor.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens, updated = row if row else (float(capacity), now)
+                tokens = min(float(capacity), tokens + max(0.0, now - updated) * rate)
+                if tokens >= 1:
+                    tokens -= 1
+                    retry_after = 0.0
+                else:
+                    retry_after = (1 - tokens) / rate
+                cursor.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                    (key, tokens, now)
+                )
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+        return retry_after
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def create_store() -> RateLimitStore:
+    """Хранилище по настройкам: файл, если задан RATE_LIMIT_STORE_PATH, иначе память"""
+    if settings.RATE_LIMIT_STORE_PATH:
+        return SQLiteRateLimitStore(settings.RATE_LIMIT_STORE_PATH)
+    return InMemoryRateLimitStore(settings.RATE_LIMIT_MAX_KEYS)
+
+
+rate_limit_store = create_store()
+
+
+def client_ip(request: Request) -> str:
+    """IP клиента (X-Forwarded-For учитывается только за доверенным прокси)"""
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimiter:
+    """Лимит для одной области (эндпоинта), ключи — IP или имя пользователя"""
+
+    def __init__(self, scope: str, rate: str, store: Optional[RateLimitStore] = None):
+        self.scope = scope
+        self.rate = rate
+        self.capacity, self.period = parse_rate(rate)
+        self._store = store
+        self._allowed = 0
+        self._limited = 0
+        RATE_LIMITERS[scope] = self
+
+    @property
+    def store(self) -> RateLimitStore:
+        return self._store or rate_limit_store
+
+    async def hit(self, key: str) -> None:
+        """Списание токена; при превышении — 429 с Retry-After"""
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        store = self.store
+        if store.blocking:
+            retry_after = await file_io_bulkhead.run(store.take, f"{self.scope}:{key}", self.capacity, self.period)
+        else:
+            retry_after = store.take(f"{self.scope}:{key}", self.capacity, self.period)
+        if retry_after <= 0:
+            self._allowed += 1
+            return
+        self._limited += 1
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Слишком много запросов, повторите попытку позже",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    def by_ip(self) -> Callable[[Request], Awaitable[None]]:
+        """Зависимость для эндпоинта: лимит по IP клиента до разбора тела запроса"""
+
+        async def check_rate_limit(request: Request) -> None:
+            await self.hit(f"ip:{client_ip(request)}")
+
+        return check_rate_limit
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "allowed": self._allowed,
+            "limited": self._limited,
+        }
+
+
+# Все лимиты по областям (для /system/metrics)
+RATE_LIMITERS: Dict[str, RateLimiter] = {}
+
+
+def get_rate_limit_stats() -> Dict[str, Dict[str, Any]]:
+    """Метрики всех лимитов"""
+    return {scope: limiter.stats() for scope, limiter in RATE_LIMITERS.items()}
+
+
+login_ip_limiter = RateLimiter("login_ip", settings.RATE_LIMIT_LOGIN_IP)
+login_user_limiter = RateLimiter("login_user", settings.RATE_LIMIT_LOGIN_USER)
+booking_ip_limiter = RateLimiter("booking_ip", settings.RATE_LIMIT_BOOKING_IP)
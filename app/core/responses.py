@@ -0,0 +1,27 @@
+"""
+Ответы с заранее сериализованным JSON
+"""
+from typing import Any, Iterable
+
+import orjson
+from fastapi.responses import Response
+
+
+class RawJSONResponse(Response):
+    """JSON-ответ из готовых байтов, без повторной валидации и сериализации"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dump_json(content)
+
+
+def dump_json(content: Any) -> bytes:
+    """Быстрая сериализация в JSON (orjson)"""
+    return orjson.dumps(content)
+
+
+def join_json_array(items: Iterable[bytes]) -> bytes:
+    """Сборка JSON-массива из уже сериализованных элементов"""
+    return b"[" + b",".join(items) + b"]"
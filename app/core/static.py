@@ -0,0 +1,81 @@
+"""
+Раздача загруженных файлов (/uploads) с долгим кешированием
+"""
+import os
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.core.config import settings
+
+# Типы, для которых ищутся заранее сжатые копии (.br, .gz)
+PRECOMPRESSED_EXTENSIONS = {".svg", ".json", ".txt", ".css", ".js"}
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class UploadFileResponse(FileResponse):
+    """FileResponse с крупными кусками чтения (файлы загрузок — до MAX_FILE_SIZE)"""
+    chunk_size = 1024 * 1024
+
+
+class UploadStaticFiles(StaticFiles):
+    """StaticFiles для /uploads.
+
+    Имена файлов уникальны и не перезаписываются (хеш содержимого или uuid),
+    поэтому ответы кешируются как immutable. Если клиент принимает сжатие
+    и рядом лежит готовая копия, отдается она (с Vary). WebP-копии
+    изображений клиент выбирает сам по image_variants, поэтому изображения
+    отдаются как есть, без Vary: Accept. Range и zero-copy отдача
+    (расширение ASGI pathsend) обеспечиваются FileResponse.
+    """
+
+    def __init__(self, *args, cache_max_age: int = settings.UPLOADS_CACHE_MAX_AGE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = f"public, max-age={cache_max_age}, immutable"
+
+    def _negotiate(
+        self, full_path: str, stat_result: os.stat_result, request_headers: Headers
+    ) -> Tuple[str, os.stat_result, Optional[str], Dict[str, str]]:
+        """Выбор готовой сжатой копии файла под Accept-Encoding"""
+        extension = os.path.splitext(full_path)[1].lower()
+        headers: Dict[str, str] = {}
+        
+        # Сжатая копия не подходит для запросов диапазона исходного файла
+        if extension in PRECOMPRESSED_EXTENSIONS and "range" not in request_headers:
+            headers["Vary"] = "Accept-Encoding"
+            accept_encoding = request_headers.get("accept-encoding", "")
+            for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+                if encoding in accept_encoding:
+                    try:
+                        compressed_stat = os.stat(full_path + suffix)
+                    except FileNotFoundError:
+                        continue
+                    media_type = UploadFileResponse(full_path).media_type
+                    return full_path + suffix, compressed_stat, media_type, {**headers, "Content-Encoding": encoding}
+        
+        return full_path, stat_result, None, headers
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        path, path_stat, media_type, headers = self._negotiate(str(full_path), stat_result, request_headers)
+        headers["Cache-Control"] = self.cache_control
+        
+        response = UploadFileResponse(
+            path,
+            status_code=status_code,
+            stat_result=path_stat,
+            media_type=media_type,
+            headers=headers,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,95 @@
+"""
+Периодические фоновые задачи приложения
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# Все созданные фоновые задачи по имени (для lifespan и /system/metrics)
+BACKGROUND_TASKS: Dict[str, "PeriodicTask"] = {}
+
+
+class PeriodicTask:
+    """Фоновая задача, запускаемая с фиксированным интервалом в lifespan"""
+
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[], Awaitable[Any]]):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self._func = func
+        self._task: Optional[asyncio.Task] = None
+        self._runs = 0
+        self._failures = 0
+        self._last_run_at: Optional[float] = None
+        self._last_duration = 0.0
+        self._last_result: Any = None
+        BACKGROUND_TASKS[name] = self
+
+    async def run_once(self) -> Any:
+        """Один запуск задачи с учетом метрик"""
+        started_at = time.monotonic()
+        try:
+            result = await self._func()
+        except Exception:
+            self._failures += 1
+            logger.exception("Периодическая задача %s завершилась с ошибкой", self.name)
+            return None
+        finally:
+            self._runs += 1
+            self._last_run_at = time.time()
+            self._last_duration = time.monotonic() - started_at
+        self._last_result = result
+        return result
+
+    async def _loop(self) -> None:
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        """Запуск задачи в текущем event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(), name=self.name)
+
+    async def stop(self) -> None:
+        """Остановка задачи"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики задачи"""
+        return {
+            "interval_seconds": self.interval_seconds,
+            "running": self._task is not None and not self._task.done(),
+            "runs": self._runs,
+            "failures": self._failures,
+            "last_run_at": self._last_run_at,
+            "last_duration_ms": round(self._last_duration * 1000, 3),
+            "last_result": self._last_result,
+        }
+
+
+def start_tasks() -> None:
+    """Запуск всех фоновых задач"""
+    for task in BACKGROUND_TASKS.values():
+        task.start()
+
+
+async def stop_tasks() -> None:
+    """Остановка всех фоновых задач"""
+    for task in BACKGROUND_TASKS.values():
+        await task.stop()
+
+
+def get_task_stats() -> Dict[str, Dict[str, Any]]:
+    """Метрики всех фоновых задач"""
+    return {name: task.stats() for name, task in BACKGROUND_TASKS.items()}
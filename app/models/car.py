@@ -2,7 +2,7 @@
 Модели автомобилей
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, Text, Index
 from sqlalchemy.dialects.sqlite import JSON
 
 from app.core.database import Base
@@ -11,23 +11,29 @@ from app.core.database import Base
 class Car(Base):
     """Модель автомобиля"""
     __tablename__ = "cars"
+    __table_args__ = (
+        # Фильтр по доступности вместе с сортировкой по цене/рейтингу
+        Index("ix_cars_available_price", "available", "price"),
+        Index("ix_cars_available_rating", "available", "rating"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    category = Column(String)
+    category = Column(String, index=True)
     category_ru = Column(String)
-    price = Column(Integer)
+    price = Column(Integer, index=True)
     price_3plus_days = Column(Integer)
     images = Column(JSON)  # Список путей к изображениям
+    image_variants = Column(JSON)  # Уменьшенные копии: {путь оригинала: [{"width", "webp", "jpeg"}]}
     description = Column(Text)
     description_ru = Column(Text)
     features = Column(JSON)  # Список особенностей
     features_ru = Column(JSON)  # Список особенностей на русском
     specifications = Column(JSON)  # Технические характеристики
     available = Column(Boolean, default=True)
-    rating = Column(Float, default=0.0)
-    fuel_type = Column(String)
+    rating = Column(Float, default=0.0, index=True)
+    fuel_type = Column(String, index=True)
     restrictions = Column(JSON)  # Ограничения
     additional_services = Column(JSON)  # Список ID дополнительных услуг
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -13,9 +13,10 @@ class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
 
     id = Column(Integer, primary_key=True, index=True)
-    token = Column(String, unique=True, index=True, nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    expires_at = Column(DateTime, nullable=False)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)  # SHA-256 токена (hex)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, nullable=True)  # Время ротации/отзыва; строка хранится для обнаружения повторного использования
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Связи
@@ -2,8 +2,15 @@
 Схемы для автомобилей
 """
 from datetime import datetime
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+from typing import Optional, List, Dict, Any, Literal
+from pydantic import BaseModel, Field
+
+
+class ImageVariant(BaseModel):
+    """Уменьшенная копия изображения (для srcset)"""
+    width: int
+    webp: str
+    jpeg: str
 
 
 class CarBase(BaseModel):
@@ -54,6 +61,7 @@ class Car(CarBase):
     """Схема автомобиля для ответа"""
     id: int
     images: Optional[List[str]] = None
+    image_variants: Optional[Dict[str, List[ImageVariant]]] = None
     created_at: datetime
     updated_at: datetime
 
@@ -61,6 +69,43 @@ class Car(CarBase):
         from_attributes = True
 
 
+class CarListItem(BaseModel):
+    """Облегченная схема автомобиля для карточек в списке"""
+    id: int
+    name: str
+    category: Optional[str] = None
+    category_ru: Optional[str] = None
+    price: Optional[int] = None
+    price_3plus_days: Optional[int] = None
+    images: Optional[List[str]] = None
+    image_variants: Optional[Dict[str, List[ImageVariant]]] = None
+    available: bool = True
+    rating: float = 0.0
+    fuel_type: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class CarListQuery(BaseModel):
+    """Параметры списка автомобилей: фильтры, сортировка и курсор"""
+    fuel_type: Optional[str] = None
+    category: Optional[str] = None
+    available: Optional[bool] = None
+    min_price: Optional[int] = None
+    max_price: Optional[int] = None
+    sort_by: Optional[Literal["price", "rating", "created_at"]] = None
+    order: Literal["asc", "desc"] = "asc"
+    cursor: Optional[str] = None
+    limit: Optional[int] = Field(default=None, ge=1, le=200)  # None — весь список без пагинации
+
+
+class CarPage(BaseModel):
+    """Страница списка автомобилей"""
+    content: bytes  # Готовый JSON-массив карточек CarListItem
+    next_cursor: Optional[str] = None
+
+
 class UploadResponse(BaseModel):
     """Схема ответа при загрузке файлов"""
     uploaded: List[str]
@@ -2,11 +2,21 @@
 Сервис для работы с дополнительными услугами
 """
 from typing import List, Optional
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.etag import data_version
 from app.models.additional_service import AdditionalService
 from app.schemas.additional_service import AdditionalServiceCreate, AdditionalServiceUpdate
 
 
+# Маркер изменений услуг в БД для ETag (правки скриптами и миграциями)
+data_version.register_marker(
+    "services",
+    select(func.max(AdditionalService.updated_at), func.count(AdditionalService.id)),
+)
+
+
 class AdditionalServiceService:
     """Сервис для работы с дополнительными услугами"""
 
@@ -32,6 +42,7 @@ class AdditionalServiceService:
         db.add(db_service)
         db.commit()
         db.refresh(db_service)
+        data_version.bump("services")
         return db_service
 
     @staticmethod
@@ -47,6 +58,7 @@ class AdditionalServiceService:
         
         db.commit()
         db.refresh(db_service)
+        data_version.bump("services")
         return db_service
 
     @staticmethod
@@ -58,9 +70,85 @@ class AdditionalServiceService:
         
         db.delete(db_service)
         db.commit()
+        data_version.bump("services")
         return True
 
     @staticmethod
     def get_active_services(db: Session) -> List[AdditionalService]:
         """Получить только активные дополнительные услуги"""
         return db.query(AdditionalService).filter(AdditionalService.is_active == True).all()
+
+
+class AsyncAdditionalServiceService:
+    """Асинхронный сервис для работы с дополнительными услугами"""
+
+    @staticmethod
+    async def get_services(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[AdditionalService]:
+        """Получить список всех дополнительных услуг"""
+        result = await db.execute(select(AdditionalService).offset(skip).limit(limit))
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def get_service(db: AsyncSession, service_id: int) -> Optional[AdditionalService]:
+        """Получить дополнительную услугу по ID"""
+        return await db.get(AdditionalService, service_id)
+
+    @staticmethod
+    async def get_service_by_service_id(db: AsyncSession, service_id: str) -> Optional[AdditionalService]:
+        """Получить дополнительную услугу по service_id"""
+        result = await db.execute(
+            select(AdditionalService).filter(AdditionalService.service_id == service_id)
+        )
+        return result.scalars().first()
+
+    @staticmethod
+    async def get_services_by_service_ids(db: AsyncSession, service_ids: List[str]) -> List[AdditionalService]:
+        """Получить дополнительные услуги по списку service_id"""
+        result = await db.execute(
+            select(AdditionalService).filter(AdditionalService.service_id.in_(service_ids))
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def create_service(db: AsyncSession, service: AdditionalServiceCreate) -> AdditionalService:
+        """Создать новую дополнительную услугу"""
+        db_service = AdditionalService(**service.dict())
+        db.add(db_service)
+        await db.commit()
+        await db.refresh(db_service)
+        data_version.bump("services")
+        return db_service
+
+    @staticmethod
+    async def update_service(db: AsyncSession, service_id: int, service: AdditionalServiceUpdate) -> Optional[AdditionalService]:
+        """Обновить дополнительную услугу"""
+        db_service = await db.get(AdditionalService, service_id)
+        if not db_service:
+            return None
+        
+        update_data = service.dict(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(db_service, field, value)
+        
+        await db.commit()
+        await db.refresh(db_service)
+        data_version.bump("services")
+        return db_service
+
+    @staticmethod
+    async def delete_service(db: AsyncSession, service_id: int) -> bool:
+        """Удалить дополнительную услугу"""
+        db_service = await db.get(AdditionalService, service_id)
+        if not db_service:
+            return False
+        
+        await db.delete(db_service)
+        await db.commit()
+        data_version.bump("services")
+        return True
+
+    @staticmethod
+    async def get_active_services(db: AsyncSession) -> List[AdditionalService]:
+        """Получить только активные дополнительные услуги"""
+        result = await db.execute(select(AdditionalService).filter(AdditionalService.is_active == True))
+        return list(result.scalars().all())
@@ -1,45 +1,183 @@
 """
 Сервис аутентификации
 """
+import asyncio
+import hashlib
+import heapq
+import logging
+import secrets
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import select, delete, update, event
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.database import AsyncSessionLocal
 from app.models.user import User
 from app.models.refresh_token import RefreshToken
-from app.schemas.user import UserCreate, UserLogin
+from app.schemas.user import UserCreate, UserLogin, User as UserSchema
+from app.services.password import pwd_context, password_hasher, PasswordHasherBusy
 
+logger = logging.getLogger(__name__)
 
-# Контекст для хеширования паролей
-# Настраиваем bcrypt для автоматического обрезания паролей
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    deprecated="auto",
-    bcrypt__ident="2b",
-    bcrypt__default_rounds=12,
-)
 
+# Кеш пользователей, найденных по токену (снимки схемы User по id)
+principal_cache = TTLCache("principals", settings.PRINCIPAL_CACHE_MAX_ENTRIES, settings.PRINCIPAL_CACHE_TTL_SECONDS)
 
-class AuthService:
-    """Сервис аутентификации"""
-    
-    def __init__(self, db: Session):
-        self.db = db
+
+# Уже проверенные access токены: sha256 токена -> payload до истечения exp
+verified_token_cache = TTLCache("verified_tokens", settings.TOKEN_CACHE_MAX_ENTRIES, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+# Результаты недавних ротаций: sha256 старого refresh токена -> (user_id, новый токен).
+# Параллельные запросы с тем же токеном (несколько вкладок) получают тот же результат без БД.
+refresh_rotation_cache = TTLCache("refresh_rotations", settings.TOKEN_CACHE_MAX_ENTRIES, max(settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS, 1))
+
+
+class AccessTokenRevocations:
+    """Отозванные access токены (по jti) до истечения их exp.
+
+    Проверка — поиск в словаре без обращения к БД. Записи удаляются после
+    exp: токен к этому моменту отклоняется и проверкой подписи.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revoked: Dict[str, float] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._rejected = 0
+
+    def _purge(self, now: float) -> None:
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, jti = heapq.heappop(self._expiry_heap)
+            self._revoked.pop(jti, None)
+
+    def revoke(self, jti: str, exp: float) -> None:
+        """Отзыв токена до момента exp (unix time)"""
+        now = time.time()
+        if exp <= now:
+            return
+        with self._lock:
+            self._purge(now)
+            self._revoked[jti] = exp
+            heapq.heappush(self._expiry_heap, (exp, jti))
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        """Токен отозван и еще не истек"""
+        if jti is None:
+            return False
+        exp = self._revoked.get(jti)
+        if exp is None or exp <= time.time():
+            return False
+        self._rejected += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._purge(time.time())
+            return {"entries": len(self._revoked), "rejected": self._rejected}
+
+
+revoked_access_tokens = AccessTokenRevocations()
+
+
+def hash_refresh_token(token: str) -> str:
+    """SHA-256 refresh токена: в БД хранится только он, а не сам JWT"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Сброс кеша пользователя после изменения или удаления"""
+    principal_cache.invalidate(user_id)
+
+
+# Пользователи, измененные в текущей транзакции сессии (ключ в session.info)
+_CHANGED_USERS_KEY = "changed_user_ids"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session: Session, flush_context) -> None:
+    """Запоминаем пользователей, измененных через ORM (роль, активность, удаление).
+
+    Кеш сбрасывается только после commit: если сбросить его при flush,
+    параллельный запрос успеет закешировать еще не замененную строку.
+    """
+    changed = {obj.id for obj in (*session.dirty, *session.deleted) if isinstance(obj, User)}
+    if changed:
+        session.info.setdefault(_CHANGED_USERS_KEY, set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_principals(session: Session) -> None:
+    """Сброс кеша пользователей, изменения которых зафиксированы"""
+    for user_id in session.info.pop(_CHANGED_USERS_KEY, ()):
+        invalidate_principal(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session) -> None:
+    """Откаченные изменения кеш не затрагивают"""
+    session.info.pop(_CHANGED_USERS_KEY, None)
+
+
+class BaseAuthService:
+    """Общая часть сервисов аутентификации: пароли и JWT"""
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Проверка пароля"""
-        # Обрезаем пароль до 72 символов для совместимости с bcrypt
-        plain_password = plain_password[:72]
-        return pwd_context.verify(plain_password, hashed_password)
+        """Проверка пароля (в пуле хеширования)"""
+        return password_hasher.verify_sync(plain_password, hashed_password)
     
     def get_password_hash(self, password: str) -> str:
-        """Хеширование пароля"""
-        # Обрезаем пароль до 72 символов для совместимости с bcrypt
-        password = password[:72]
-        return pwd_context.hash(password)
+        """Хеширование пароля (в пуле хеширования)"""
+        return password_hasher.hash_sync(password)
+    
+    def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None):
+        """Создание access токена"""
+        to_encode = data.copy()
+        if expires_delta:
+            expire = datetime.utcnow() + expires_delta
+        else:
+            expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        
+        # jti позволяет отозвать конкретный токен до истечения exp
+        to_encode.update({"exp": expire, "jti": secrets.token_hex(16)})
+        encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+        return encoded_jwt
+    
+    def verify_token(self, token: str) -> Optional[dict]:
+        """Проверка токена.
+
+        Подпись проверяется один раз; дальше payload берется из LRU по хешу
+        токена до истечения его exp.
+        """
+        digest = hashlib.sha256(token.encode()).digest()
+        payload = verified_token_cache.get(digest)
+        if payload is not None:
+            return payload
+        
+        try:
+            payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        except JWTError:
+            return None
+        
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            ttl = exp - time.time()
+            if ttl > 0:
+                verified_token_cache.set(digest, payload, ttl=ttl)
+        return payload
+
+
+class AuthService(BaseAuthService):
+    """Сервис аутентификации"""
+    
+    def __init__(self, db: Session):
+        self.db = db
     
     def create_user(self, user_data: UserCreate) -> User:
         """Создание пользователя"""
@@ -80,26 +218,6 @@ class AuthService:
         """Получение пользователя по имени пользователя"""
         return self.db.query(User).filter(User.username == username).first()
     
-    def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None):
-        """Создание access токена"""
-        to_encode = data.copy()
-        if expires_delta:
-            expire = datetime.utcnow() + expires_delta
-        else:
-            expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        
-        to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
-        return encoded_jwt
-    
-    def verify_token(self, token: str) -> Optional[dict]:
-        """Проверка токена"""
-        try:
-            payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-            return payload
-        except JWTError:
-            return None
-    
     def create_refresh_token(self, user_id: int) -> str:
         """Создание refresh токена"""
         # Удаляем старые refresh токены пользователя
@@ -115,7 +233,7 @@ class AuthService:
         
         # Сохраняем в базе данных
         db_token = RefreshToken(
-            token=token,
+            token_hash=hash_refresh_token(token),
             user_id=user_id,
             expires_at=expires_at
         )
@@ -133,7 +251,10 @@ class AuthService:
                 return None
             
             # Проверяем, что токен существует в базе данных
-            db_token = self.db.query(RefreshToken).filter(RefreshToken.token == token).first()
+            db_token = self.db.query(RefreshToken).filter(
+                RefreshToken.token_hash == hash_refresh_token(token),
+                RefreshToken.revoked_at.is_(None)
+            ).first()
             if not db_token:
                 return None
             
@@ -152,7 +273,7 @@ class AuthService:
     
     def revoke_refresh_token(self, token: str) -> bool:
         """Отзыв refresh токена"""
-        db_token = self.db.query(RefreshToken).filter(RefreshToken.token == token).first()
+        db_token = self.db.query(RefreshToken).filter(RefreshToken.token_hash == hash_refresh_token(token)).first()
         if db_token:
             self.db.delete(db_token)
             self.db.commit()
@@ -164,3 +285,265 @@ class AuthService:
         self.db.query(RefreshToken).filter(RefreshToken.user_id == user_id).delete()
         self.db.commit()
         return True
+
+
+class AsyncAuthService(BaseAuthService):
+    """Асинхронный сервис аутентификации"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def create_user(self, user_data: UserCreate) -> User:
+        """Создание пользователя"""
+        # Проверяем, существует ли пользователь с таким username
+        existing_user = await self.get_user_by_username(user_data.username)
+        if existing_user:
+            raise ValueError("Пользователь с таким username уже существует")
+        
+        # Создаем нового пользователя
+        hashed_password = await password_hasher.hash(user_data.password)
+        db_user = User(
+            username=user_data.username,
+            password=hashed_password,
+        )
+        
+        self.db.add(db_user)
+        await self.db.commit()
+        await self.db.refresh(db_user)
+        
+        return db_user
+    
+    async def authenticate_user(self, login_data: UserLogin) -> Optional[User]:
+        """Аутентификация пользователя.
+
+        Транзакция чтения завершается до проверки пароля, чтобы соединение
+        не было занято на время bcrypt.
+        """
+        user = await self.get_user_by_username(login_data.username)
+        await self.db.commit()
+        if not user:
+            return None
+        if not await password_hasher.verify(login_data.password, user.password):
+            return None
+        if not user.is_active:
+            return None
+        return user
+    
+    async def rehash_password(self, user: User, password: str) -> Optional[str]:
+        """Новый хеш с текущей стоимостью bcrypt, если старый устарел (без записи в БД)"""
+        if not password_hasher.needs_update(user.password):
+            return None
+        try:
+            return await password_hasher.hash(password)
+        except PasswordHasherBusy:
+            # Вход важнее: пересчитаем при следующем входе
+            return None
+    
+    async def get_user_by_id(self, user_id: int) -> Optional[User]:
+        """Получение пользователя по ID"""
+        return await self.db.get(User, user_id)
+    
+    async def get_user_by_username(self, username: str) -> Optional[User]:
+        """Получение пользователя по имени пользователя"""
+        result = await self.db.execute(select(User).filter(User.username == username))
+        return result.scalars().first()
+    
+    async def get_principal(self, user_id: int) -> Optional[UserSchema]:
+        """Пользователь для авторизации запроса (из кеша, если он актуален)"""
+        cached = principal_cache.get(user_id)
+        if cached is not None:
+            return cached
+        
+        version = principal_cache.version
+        db_user = await self.get_user_by_id(user_id)
+        if db_user is None:
+            return None
+        user = UserSchema.model_validate(db_user)
+        principal_cache.set(user_id, user, version=version)
+        return user
+    
+    def _issue_refresh_token(self, user_id: int) -> str:
+        """Новый refresh токен, добавленный в текущую транзакцию (без commit)"""
+        expires_at = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        token_data = {
+            "user_id": user_id,
+            "exp": expires_at.timestamp(),
+            "nonce": secrets.token_hex(8),
+        }
+        token = jwt.encode(token_data, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+        
+        self.db.add(RefreshToken(
+            token_hash=hash_refresh_token(token),
+            user_id=user_id,
+            expires_at=expires_at
+        ))
+        return token
+    
+    async def create_refresh_token(self, user_id: int, password_hash: Optional[str] = None) -> str:
+        """Создание refresh токена.
+
+        Пересчитанный при входе хеш пароля записывается в той же короткой транзакции.
+        """
+        if password_hash is not None:
+            await self.db.execute(update(User).filter(User.id == user_id).values(password=password_hash))
+        
+        # Удаляем старые refresh токены пользователя
+        await self.db.execute(delete(RefreshToken).filter(RefreshToken.user_id == user_id))
+        
+        token = self._issue_refresh_token(user_id)
+        await self.db.commit()
+        
+        if password_hash is not None:
+            password_hasher.record_rehash()
+        return token
+    
+    async def rotate_refresh_token(self, token: str) -> Optional[Tuple[int, str]]:
+        """Ротация refresh токена одной транзакцией.
+
+        Старый токен атомарно помечается отозванным (UPDATE ... RETURNING),
+        в той же транзакции выпускается новый. Повторное предъявление уже
+        ротированного токена в пределах REFRESH_TOKEN_REUSE_GRACE_SECONDS
+        отдает тот же новый токен (гонка вкладок), позже — считается
+        утечкой и отзывает все токены пользователя.
+
+        Возвращает (user_id, новый refresh токен) или None.
+        """
+        try:
+            payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        except JWTError:
+            return None
+        if payload.get("user_id") is None:
+            return None
+        
+        token_hash = hash_refresh_token(token)
+        rotated = refresh_rotation_cache.get(token_hash)
+        if rotated is not None:
+            return rotated
+        
+        now = datetime.utcnow()
+        active_users = select(User.id).filter(User.is_active == True)
+        result = await self.db.execute(
+            update(RefreshToken)
+            .filter(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.revoked_at.is_(None),
+                RefreshToken.expires_at > now,
+                RefreshToken.user_id.in_(active_users),
+            )
+            .values(revoked_at=now)
+            .returning(RefreshToken.user_id)
+        )
+        user_id = result.scalar()
+        
+        if user_id is None:
+            return await self._handle_refresh_token_reuse(token_hash, now)
+        
+        new_token = self._issue_refresh_token(user_id)
+        rotated = (user_id, new_token)
+        # Результат публикуется до commit: параллельный запрос, чей UPDATE
+        # не нашел строку сразу после нашего commit, уже найдет его в кеше
+        if settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS > 0:
+            refresh_rotation_cache.set(token_hash, rotated)
+        try:
+            await self.db.commit()
+        except BaseException:
+            refresh_rotation_cache.invalidate(token_hash)
+            raise
+        return rotated
+    
+    async def _handle_refresh_token_reuse(self, token_hash: str, now: datetime) -> Optional[Tuple[int, str]]:
+        """Реакция на предъявление недействительного refresh токена.
+
+        Если токен только что ротировал параллельный запрос (в пределах
+        окна), возвращает результат той ротации, иначе None.
+        """
+        result = await self.db.execute(
+            select(RefreshToken.user_id, RefreshToken.revoked_at)
+            .filter(RefreshToken.token_hash == token_hash)
+        )
+        row = result.first()
+        grace = timedelta(seconds=settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS)
+        if row is None or row.revoked_at is None:
+            # Неизвестный или истекший токен
+            await self.db.rollback()
+            return None
+        if now - row.revoked_at <= grace:
+            # Гонка параллельных ротаций: победитель уже положил результат в кеш
+            await self.db.rollback()
+            return refresh_rotation_cache.get(token_hash)
+        
+        logger.warning("Повторное использование refresh токена, отзываем все токены пользователя %s", row.user_id)
+        await self.db.execute(
+            update(RefreshToken)
+            .filter(RefreshToken.user_id == row.user_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=now)
+        )
+        await self.db.commit()
+        return None
+    
+    async def verify_refresh_token(self, token: str) -> Optional[User]:
+        """Проверка refresh токена"""
+        try:
+            payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+            user_id = payload.get("user_id")
+            if user_id is None:
+                return None
+            
+            # Проверяем, что токен существует в базе данных
+            result = await self.db.execute(select(RefreshToken).filter(
+                RefreshToken.token_hash == hash_refresh_token(token),
+                RefreshToken.revoked_at.is_(None)
+            ))
+            db_token = result.scalars().first()
+            if not db_token:
+                return None
+            
+            # Проверяем, что токен не истек
+            if db_token.expires_at < datetime.utcnow():
+                await self.db.delete(db_token)
+                await self.db.commit()
+                return None
+            
+            # Получаем пользователя
+            user = await self.get_user_by_id(user_id)
+            return user
+            
+        except JWTError:
+            return None
+    
+    async def revoke_refresh_token(self, token: str) -> bool:
+        """Отзыв refresh токена"""
+        result = await self.db.execute(delete(RefreshToken).filter(RefreshToken.token_hash == hash_refresh_token(token)))
+        await self.db.commit()
+        return result.rowcount > 0
+    
+    async def revoke_all_user_tokens(self, user_id: int) -> bool:
+        """Отзыв всех refresh токенов пользователя"""
+        await self.db.execute(delete(RefreshToken).filter(RefreshToken.user_id == user_id))
+        await self.db.commit()
+        # Недавние ротации тоже больше не должны выдавать токены
+        refresh_rotation_cache.clear()
+        return True
+
+
+async def reap_expired_refresh_tokens(batch_size: int = settings.REFRESH_TOKEN_REAPER_BATCH_SIZE) -> int:
+    """Удаление истекших refresh токенов пачками.
+
+    Каждая пачка — отдельная короткая транзакция, чтобы не держать
+    соединение-писатель надолго.
+    """
+    deleted_total = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            expired_ids = (
+                select(RefreshToken.id)
+                .filter(RefreshToken.expires_at < datetime.utcnow())
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            result = await db.execute(delete(RefreshToken).filter(RefreshToken.id.in_(expired_ids)))
+            await db.commit()
+            deleted_total += result.rowcount
+            if result.rowcount < batch_size:
+                return deleted_total
+            await asyncio.sleep(0)
@@ -1,12 +1,198 @@
 """
 Сервис для работы с автомобилями
 """
+import base64
+import json
+from datetime import datetime
 from typing import List, Optional, Dict, Any, Tuple, Set
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, and_, or_
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.etag import data_version
+from app.core.responses import dump_json, join_json_array
 from app.models.car import Car
 from app.models.additional_service import AdditionalService
-from app.schemas.car import CarCreate, CarUpdate
+from app.schemas.car import Car as CarSchema, CarCreate, CarUpdate, CarListItem, CarListQuery, CarPage
+
+
+# Кеш списков каталога (страницы списка, популярные, агрегаты) и отдельных автомобилей.
+# Хранятся pydantic-снимки, а не ORM-объекты, поэтому они не привязаны к сессии.
+catalog_cache = TTLCache("catalog", settings.CATALOG_CACHE_MAX_ENTRIES, settings.CATALOG_CACHE_TTL_SECONDS)
+car_cache = TTLCache("cars", settings.CATALOG_CACHE_MAX_ENTRIES, settings.CATALOG_CACHE_TTL_SECONDS)
+
+# Готовые JSON-байты автомобилей. Ключ включает updated_at, поэтому запись
+# пересобирается только после изменения этого автомобиля, а при сборке списка
+# байты неизмененных автомобилей берутся повторно.
+serialized_cache = TTLCache("serialized", settings.SERIALIZED_CACHE_MAX_ENTRIES, settings.CATALOG_CACHE_TTL_SECONDS)
+
+
+def invalidate_car_cache(car_id: Optional[int] = None) -> None:
+    """Сброс кеша каталога после изменения автомобиля"""
+    data_version.bump("cars")
+    catalog_cache.clear()
+    if car_id is None:
+        car_cache.clear()
+    else:
+        car_cache.invalidate(car_id)
+
+
+def _clear_car_caches() -> None:
+    """Сброс кешей каталога после изменения автомобилей в обход приложения"""
+    catalog_cache.clear()
+    car_cache.clear()
+
+
+# Маркер изменений автомобилей в БД для ETag (правки скриптами и миграциями)
+data_version.register_marker(
+    "cars",
+    select(func.max(Car.updated_at), func.count(Car.id)),
+    on_change=_clear_car_caches,
+)
+
+
+def _dump_car(car: CarSchema) -> bytes:
+    """JSON полной схемы автомобиля (с кешем по id и updated_at)"""
+    cache_key = ("car", car.id, car.updated_at)
+    content = serialized_cache.get(cache_key)
+    if content is None:
+        content = dump_json(car.model_dump())
+        serialized_cache.set(cache_key, content)
+    return content
+
+
+def _dump_card(car: Car) -> bytes:
+    """JSON карточки списка из строки БД (с кешем по id и updated_at)"""
+    cache_key = ("card", car.id, car.updated_at)
+    content = serialized_cache.get(cache_key)
+    if content is None:
+        content = dump_json(CarListItem.model_validate(car).model_dump())
+        serialized_cache.set(cache_key, content)
+    return content
+
+
+def _prune_image_variants(db_car: Car) -> None:
+    """Оставляет уменьшенные копии только для текущих изображений автомобиля"""
+    if db_car.image_variants:
+        images = set(db_car.images or [])
+        db_car.image_variants = {path: variants for path, variants in db_car.image_variants.items() if path in images}
+
+
+# Агрегаты для фильтров считаются в БД, без загрузки строк автомобилей
+_FUEL_TYPES_QUERY = (
+    select(Car.fuel_type)
+    .where(Car.fuel_type.isnot(None), Car.fuel_type != "")
+    .distinct()
+    .order_by(Car.fuel_type)
+)
+_PRICE_RANGE_QUERY = select(func.min(Car.price), func.max(Car.price))
+
+
+def _build_meta(fuel_types: List[str], min_price: Optional[int], max_price: Optional[int]) -> Dict[str, Any]:
+    """Формирование ответа с агрегатами для фильтров"""
+    return {
+        "fuel_types": list(fuel_types),
+        "min_price": int(min_price) if min_price is not None else None,
+        "max_price": int(max_price) if max_price is not None else None,
+    }
+
+
+# Колонки для карточек списка; описания и JSON-характеристики не загружаются.
+# created_at нужен для курсора при сортировке по дате, updated_at — для кеша JSON.
+_LIST_COLUMNS = [getattr(Car, field) for field in CarListItem.model_fields] + [Car.created_at, Car.updated_at]
+
+# Размер страницы, если передан только курсор
+DEFAULT_PAGE_LIMIT = 50
+
+# Колонки, по которым разрешена сортировка списка
+_SORT_COLUMNS = {
+    "price": Car.price,
+    "rating": Car.rating,
+    "created_at": Car.created_at,
+}
+
+
+def _encode_cursor(query: CarListQuery, car: Car) -> str:
+    """Курсор следующей страницы: значение сортировки и id последней строки"""
+    value = getattr(car, query.sort_by) if query.sort_by else None
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps({"s": f"{query.sort_by}:{query.order}", "v": value, "id": car.id})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(query: CarListQuery) -> Tuple[Any, int]:
+    """Разбор курсора; ValueError если он поврежден или от другой сортировки"""
+    try:
+        padded = query.cursor + "=" * (-len(query.cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, last_id = data["v"], int(data["id"])
+        if data["s"] != f"{query.sort_by}:{query.order}":
+            raise ValueError("sort mismatch")
+        if query.sort_by == "created_at" and value is not None:
+            value = datetime.fromisoformat(value)
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("Неверный курсор") from e
+    return value, last_id
+
+
+def _after_value(column, value: Any, last_id: int, descending: bool):
+    """Условие «после курсора» для непустых значений сортировки (column, id).
+
+    Записано через >=/<=, чтобы SQLite искал по индексу колонки, а не сканировал его.
+    """
+    if descending:
+        return and_(column <= value, or_(column < value, Car.id < last_id))
+    return and_(column >= value, or_(column > value, Car.id > last_id))
+
+
+def _build_list_segments(query: CarListQuery) -> List[Any]:
+    """SELECT-запросы страницы списка в порядке выдачи.
+
+    Строки с NULL в колонке сортировки выбираются отдельным сегментом
+    (в SQLite они идут первыми при ASC и последними при DESC), поэтому
+    каждый сегмент использует индекс, а не OR-условие с временной сортировкой.
+    """
+    stmt = select(Car).options(load_only(*_LIST_COLUMNS))
+    if query.fuel_type is not None:
+        stmt = stmt.where(Car.fuel_type == query.fuel_type)
+    if query.category is not None:
+        stmt = stmt.where(Car.category == query.category)
+    if query.available is not None:
+        stmt = stmt.where(Car.available == query.available)
+    if query.min_price is not None:
+        stmt = stmt.where(Car.price >= query.min_price)
+    if query.max_price is not None:
+        stmt = stmt.where(Car.price <= query.max_price)
+    
+    descending = query.order == "desc"
+    id_order = Car.id.desc() if descending else Car.id.asc()
+    column = _SORT_COLUMNS.get(query.sort_by)
+    cursor = _decode_cursor(query) if query.cursor else None
+    
+    if column is None:
+        if cursor:
+            last_id = cursor[1]
+            stmt = stmt.where(Car.id < last_id if descending else Car.id > last_id)
+        return [stmt.order_by(id_order)]
+    
+    null_segment = stmt.where(column.is_(None)).order_by(id_order)
+    value_segment = stmt.where(column.isnot(None)).order_by(
+        column.desc() if descending else column.asc(), id_order
+    )
+    nulls_first = not descending
+    
+    if cursor is not None:
+        value, last_id = cursor
+        if value is None:
+            # Курсор внутри NULL-сегмента
+            null_segment = null_segment.where(Car.id < last_id if descending else Car.id > last_id)
+            return [null_segment, value_segment] if nulls_first else [null_segment]
+        value_segment = value_segment.where(_after_value(column, value, last_id, descending))
+        return [value_segment] if nulls_first else [value_segment, null_segment]
+    return [null_segment, value_segment] if nulls_first else [value_segment, null_segment]
 
 
 class CarService:
@@ -29,6 +215,7 @@ class CarService:
         self.db.add(db_car)
         self.db.commit()
         self.db.refresh(db_car)
+        invalidate_car_cache(db_car.id)
         return db_car
     
     def update_car(self, car_id: int, car_data: CarUpdate) -> Optional[Car]:
@@ -41,9 +228,12 @@ class CarService:
         update_data = car_data.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_car, field, value)
+        if "images" in update_data:
+            _prune_image_variants(db_car)
         
         self.db.commit()
         self.db.refresh(db_car)
+        invalidate_car_cache(car_id)
         return db_car
     
     def delete_car(self, car_id: int) -> bool:
@@ -54,6 +244,7 @@ class CarService:
         
         self.db.delete(db_car)
         self.db.commit()
+        invalidate_car_cache(car_id)
         return True
     
     def update_car_images(self, car_id: int, images: List[str]) -> Optional[Car]:
@@ -63,28 +254,17 @@ class CarService:
             return None
         
         db_car.images = images
+        _prune_image_variants(db_car)
         self.db.commit()
         self.db.refresh(db_car)
+        invalidate_car_cache(car_id)
         return db_car
 
     def get_meta(self) -> Dict[str, Any]:
         """Агрегированные данные: типы топлива и диапазон цен"""
-        cars: List[Car] = self.get_cars()
-        fuel_types: Set[str] = set()
-        prices: List[int] = []
-        for car in cars:
-            if car.fuel_type:
-                fuel_types.add(car.fuel_type)
-            if car.price is not None:
-                prices.append(int(car.price))
-
-        min_price: Optional[int] = min(prices) if prices else None
-        max_price: Optional[int] = max(prices) if prices else None
-        return {
-            "fuel_types": sorted(list(fuel_types)),
-            "min_price": min_price,
-            "max_price": max_price,
-        }
+        fuel_types = self.db.execute(_FUEL_TYPES_QUERY).scalars().all()
+        min_price, max_price = self.db.execute(_PRICE_RANGE_QUERY).one()
+        return _build_meta(fuel_types, min_price, max_price)
 
     def get_popular(self, limit: int = 8) -> List[Car]:
         """Популярные автомобили по рейтингу"""
@@ -106,3 +286,209 @@ class CarService:
             .filter(AdditionalService.id.in_(service_ids))
             .all()
         )
+
+
+class AsyncCarService:
+    """Асинхронный сервис для работы с автомобилями"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get_cars_page(self, query: CarListQuery) -> CarPage:
+        """Страница списка автомобилей с фильтрами и keyset-пагинацией (готовый JSON)"""
+        cache_key = ("cars_page", tuple(query.model_dump().items()))
+        cached = catalog_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        version = catalog_cache.version
+        limit = query.limit
+        if limit is None and query.cursor:
+            limit = DEFAULT_PAGE_LIMIT
+        
+        rows: List[Car] = []
+        next_cursor = None
+        if limit is None:
+            # Без пагинации: весь список, как до появления курсоров
+            for segment in _build_list_segments(query):
+                result = await self.db.execute(segment)
+                rows.extend(result.scalars().all())
+        else:
+            # Лишняя строка показывает, есть ли следующая страница
+            for segment in _build_list_segments(query):
+                remaining = limit + 1 - len(rows)
+                if remaining <= 0:
+                    break
+                result = await self.db.execute(segment.limit(remaining))
+                rows.extend(result.scalars().all())
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = _encode_cursor(query, rows[-1])
+        page = CarPage(
+            content=join_json_array(_dump_card(car) for car in rows),
+            next_cursor=next_cursor,
+        )
+        catalog_cache.set(cache_key, page, version=version)
+        return page
+    
+    async def get_car_by_id(self, car_id: int) -> Optional[CarSchema]:
+        """Получение автомобиля по ID (из кеша, если он актуален)"""
+        cached = car_cache.get(car_id)
+        if cached is not None:
+            return cached
+        
+        version = car_cache.version
+        db_car = await self._get_car_row(car_id)
+        if not db_car:
+            return None
+        car = CarSchema.model_validate(db_car)
+        car_cache.set(car_id, car, version=version)
+        return car
+    
+    async def get_car_json(self, car_id: int) -> Optional[bytes]:
+        """JSON автомобиля по ID"""
+        car = await self.get_car_by_id(car_id)
+        if car is None:
+            return None
+        return _dump_car(car)
+    
+    async def _get_car_row(self, car_id: int) -> Optional[Car]:
+        """Получение ORM-объекта автомобиля для изменения (без кеша)"""
+        return await self.db.get(Car, car_id)
+    
+    async def create_car(self, car_data: CarCreate) -> Car:
+        """Создание нового автомобиля"""
+        db_car = Car(**car_data.dict())
+        self.db.add(db_car)
+        await self.db.commit()
+        await self.db.refresh(db_car)
+        invalidate_car_cache(db_car.id)
+        return db_car
+    
+    async def update_car(self, car_id: int, car_data: CarUpdate) -> Optional[Car]:
+        """Обновление автомобиля"""
+        db_car = await self._get_car_row(car_id)
+        if not db_car:
+            return None
+        
+        # Обновляем только переданные поля
+        update_data = car_data.dict(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(db_car, field, value)
+        if "images" in update_data:
+            _prune_image_variants(db_car)
+        
+        await self.db.commit()
+        await self.db.refresh(db_car)
+        invalidate_car_cache(car_id)
+        return db_car
+    
+    async def delete_car(self, car_id: int) -> bool:
+        """Удаление автомобиля"""
+        db_car = await self._get_car_row(car_id)
+        if not db_car:
+            return False
+        
+        await self.db.delete(db_car)
+        await self.db.commit()
+        invalidate_car_cache(car_id)
+        return True
+    
+    async def update_car_images(self, car_id: int, images: List[str]) -> Optional[Car]:
+        """Обновление изображений автомобиля"""
+        db_car = await self._get_car_row(car_id)
+        if not db_car:
+            return None
+        
+        db_car.images = images
+        _prune_image_variants(db_car)
+        # Перечитываем до фиксации: commit возвращает соединение-писатель,
+        # и фоновые задачи запроса могут сразу его занять
+        await self.db.flush()
+        await self.db.refresh(db_car)
+        await self.db.commit()
+        invalidate_car_cache(car_id)
+        return db_car
+    
+    async def append_car_images(self, car_id: int, images: List[str]) -> Optional[Car]:
+        """Добавление изображений в конец списка одной транзакцией.
+
+        Список читается заново на соединении-писателе, поэтому параллельные
+        загрузки не затирают изображения друг друга.
+        """
+        db_car = await self._get_car_row(car_id)
+        if not db_car:
+            return None
+        
+        db_car.images = (db_car.images or []) + images
+        await self.db.commit()
+        invalidate_car_cache(car_id)
+        return db_car
+    
+    async def set_image_variants(self, car_id: int, variants: Dict[str, List[Dict[str, Any]]]) -> List[str]:
+        """Сохранение уменьшенных копий изображений автомобиля.
+
+        Копии принимаются только для изображений, которые все еще есть у
+        автомобиля; возвращает оригиналы, для которых копии не нужны.
+        """
+        db_car = await self._get_car_row(car_id)
+        if not db_car:
+            return list(variants)
+        
+        images = set(db_car.images or [])
+        accepted = {path: value for path, value in variants.items() if path in images}
+        if accepted:
+            db_car.image_variants = {**(db_car.image_variants or {}), **accepted}
+            await self.db.commit()
+            invalidate_car_cache(car_id)
+        return [path for path in variants if path not in accepted]
+
+    async def get_meta(self) -> Dict[str, Any]:
+        """Агрегированные данные: типы топлива и диапазон цен.
+
+        Результат хранится в кеше каталога до следующего изменения автомобилей.
+        """
+        cached = catalog_cache.get("meta")
+        if cached is not None:
+            return cached
+        
+        version = catalog_cache.version
+        fuel_types = (await self.db.execute(_FUEL_TYPES_QUERY)).scalars().all()
+        min_price, max_price = (await self.db.execute(_PRICE_RANGE_QUERY)).one()
+        meta = _build_meta(fuel_types, min_price, max_price)
+        catalog_cache.set("meta", meta, version=version)
+        return meta
+
+    async def get_popular(self, limit: int = 8) -> List[CarSchema]:
+        """Популярные автомобили по рейтингу"""
+        cache_key = ("popular", limit)
+        cached = catalog_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        version = catalog_cache.version
+        result = await self.db.execute(
+            select(Car)
+            .order_by(Car.rating.desc())
+            .limit(limit)
+        )
+        cars = [CarSchema.model_validate(car) for car in result.scalars().all()]
+        catalog_cache.set(cache_key, cars, version=version)
+        return cars
+
+    async def get_popular_json(self, limit: int = 8) -> bytes:
+        """JSON списка популярных автомобилей"""
+        cars = await self.get_popular(limit=limit)
+        return join_json_array(_dump_car(car) for car in cars)
+
+    async def get_car_services(self, car_id: int) -> List[AdditionalService]:
+        """Получить дополнительные услуги для автомобиля (по id из car.additional_services)"""
+        car = await self.get_car_by_id(car_id)
+        if not car or not car.additional_services:
+            return []
+        service_ids: List[int] = [int(sid) for sid in car.additional_services]
+        result = await self.db.execute(
+            select(AdditionalService)
+            .filter(AdditionalService.id.in_(service_ids))
+        )
+        return list(result.scalars().all())
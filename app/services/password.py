@@ -0,0 +1,306 @@
+"""
+Хеширование паролей bcrypt в выделенном пуле
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+from passlib.context import CryptContext
+from passlib.hash import bcrypt
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Контекст для хеширования паролей
+# Настраиваем bcrypt для автоматического обрезания паролей
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__ident="2b",
+    bcrypt__default_rounds=12,
+)
+
+
+@lru_cache(maxsize=8)
+def _bcrypt_with_rounds(rounds: int):
+    """Обработчик bcrypt с заданной стоимостью"""
+    return bcrypt.using(rounds=rounds, ident="2b")
+
+
+def hash_password(password: str, rounds: int = 12) -> str:
+    """Хеширование пароля (выполняется в пуле).
+
+    Стоимость передается явно: у процессов пула своя копия pwd_context.
+    """
+    # Обрезаем пароль до 72 символов для совместимости с bcrypt
+    return _bcrypt_with_rounds(rounds).hash(password[:72])
+
+
+def measure_hash_seconds(rounds: int) -> float:
+    """Время одного хеширования bcrypt с заданной стоимостью (лучшее из двух)"""
+    timings = []
+    for _ in range(2):
+        started_at = time.perf_counter()
+        _bcrypt_with_rounds(rounds).hash("calibration-password")
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    """Проверка пароля (выполняется в пуле)"""
+    # Обрезаем пароль до 72 символов для совместимости с bcrypt
+    return pwd_context.verify(password[:72], hashed_password)
+
+
+class PasswordHasherBusy(Exception):
+    """Пул хеширования перегружен: задача не дождалась своей очереди"""
+
+
+class PasswordHasher:
+    """Пул для bcrypt с ограничением параллелизма, таймаутом очереди и метриками.
+
+    bcrypt освобождает GIL, поэтому по умолчанию используется пул потоков;
+    пул процессов включается настройкой PASSWORD_HASH_USE_PROCESSES.
+    """
+
+    def __init__(self, max_workers: int, queue_timeout: float, use_processes: bool = False, rounds: int = 12):
+        self.max_workers = max_workers
+        self.rounds = rounds
+        self.queue_timeout = queue_timeout
+        self.use_processes = use_processes
+        self._executor: Executor = (
+            ProcessPoolExecutor(max_workers=max_workers)
+            if use_processes
+            else ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+        )
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+        self._completed: Dict[str, int] = {"hash": 0, "verify": 0}
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_duration = 0.0
+        self._rehashed = 0
+        self._calibration: Dict[str, Any] = {}
+
+    def configure_rounds(self, rounds: int) -> None:
+        """Установка стоимости bcrypt: новые хеши и needs_update() используют ее"""
+        self.rounds = rounds
+        pwd_context.update(
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds,
+        )
+
+    async def calibrate(self, target_ms: int, min_rounds: int, max_rounds: int) -> int:
+        """Подбор стоимости bcrypt под целевое время на этом железе.
+
+        Замеряется хеш с минимальной стоимостью в пуле хеширования; каждый
+        следующий раунд удваивает время, поэтому берется наибольшая
+        стоимость, укладывающаяся в target_ms.
+        """
+        loop = asyncio.get_running_loop()
+        base_seconds = await loop.run_in_executor(self._executor, measure_hash_seconds, min_rounds)
+        rounds = min_rounds
+        while rounds < max_rounds and base_seconds * 2 ** (rounds + 1 - min_rounds) * 1000 <= target_ms:
+            rounds += 1
+        self.configure_rounds(rounds)
+        self._calibration = {
+            "target_ms": target_ms,
+            "base_rounds": min_rounds,
+            "base_ms": round(base_seconds * 1000, 3),
+            "estimated_ms": round(base_seconds * 2 ** (rounds - min_rounds) * 1000, 3),
+        }
+        logger.info("Стоимость bcrypt: %s (оценка %.1f мс)", rounds, self._calibration["estimated_ms"])
+        return rounds
+
+    def needs_update(self, hashed_password: str) -> bool:
+        """Хеш создан с другой стоимостью и должен быть пересчитан"""
+        return pwd_context.needs_update(hashed_password)
+
+    def record_rehash(self) -> None:
+        with self._lock:
+            self._rehashed += 1
+
+    def _record(self, kind: str, wait: float, duration: float) -> None:
+        with self._lock:
+            self._completed[kind] += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self._total_duration += duration
+
+    async def _run(self, kind: str, func: Callable[..., Any], *args: Any) -> Any:
+        """Ожидание свободного слота (не дольше queue_timeout) и выполнение в пуле"""
+        queued_at = time.monotonic()
+        with self._lock:
+            self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._rejected += 1
+            raise PasswordHasherBusy("Слишком много одновременных проверок пароля")
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        
+        started_at = time.monotonic()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._semaphore.release()
+            with self._lock:
+                self._in_flight -= 1
+            self._record(kind, started_at - queued_at, time.monotonic() - started_at)
+
+    async def hash(self, password: str) -> str:
+        """Хеширование пароля вне event loop"""
+        return await self._run("hash", hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Проверка пароля вне event loop"""
+        return await self._run("verify", verify_password, password, hashed_password)
+
+    def hash_sync(self, password: str) -> str:
+        """Хеширование пароля из синхронного кода (скрипты, sync-сервисы)"""
+        started_at = time.monotonic()
+        result = self._executor.submit(hash_password, password, self.rounds).result()
+        self._record("hash", 0.0, time.monotonic() - started_at)
+        return result
+
+    def verify_sync(self, password: str, hashed_password: str) -> bool:
+        """Проверка пароля из синхронного кода"""
+        started_at = time.monotonic()
+        result = self._executor.submit(verify_password, password, hashed_password).result()
+        self._record("verify", 0.0, time.monotonic() - started_at)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики пула хеширования"""
+        with self._lock:
+            completed = sum(self._completed.values())
+            return {
+                "executor": "process" if self.use_processes else "thread",
+                "max_workers": self.max_workers,
+                "rounds": self.rounds,
+                "calibration": self._calibration,
+                "rehashed": self._rehashed,
+                "queue_timeout_seconds": self.queue_timeout,
+                "waiting": self._waiting,
+                "in_flight": self._in_flight,
+                "hashed": self._completed["hash"],
+                "verified": self._completed["verify"],
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._total_wait / completed * 1000, 3) if completed else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+                "avg_duration_ms": round(self._total_duration / completed * 1000, 3) if completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        """Остановка пула"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def load_calibrated_rounds(path: str) -> Optional[int]:
+    """Сохраненная стоимость bcrypt, если она подобрана под текущие настройки"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    rounds = data.get("rounds") if isinstance(data, dict) else None
+    if (
+        not isinstance(rounds, int)
+        or data.get("target_ms") != settings.PASSWORD_HASH_TARGET_MS
+        or not settings.PASSWORD_HASH_MIN_ROUNDS <= rounds <= settings.PASSWORD_HASH_MAX_ROUNDS
+    ):
+        return None
+    return rounds
+
+
+# До configure_password_hashing() (и в скриптах без нее) — заданная или сохраненная стоимость
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    queue_timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS,
+    use_processes=settings.PASSWORD_HASH_USE_PROCESSES,
+    rounds=(
+        settings.PASSWORD_HASH_ROUNDS
+        or (settings.PASSWORD_HASH_CALIBRATION_FILE and load_calibrated_rounds(settings.PASSWORD_HASH_CALIBRATION_FILE))
+        or 12
+    ),
+)
+password_hasher.configure_rounds(password_hasher.rounds)
+
+
+def store_calibrated_rounds(path: str, rounds: int) -> int:
+    """Сохранение подобранной стоимости.
+
+    Если другой воркер уже сохранил свою, возвращается она: все процессы
+    должны хешировать с одной стоимостью.
+    """
+    content = json.dumps({"rounds": rounds, "target_ms": settings.PASSWORD_HASH_TARGET_MS})
+    try:
+        with open(path, "x") as f:
+            f.write(content)
+        return rounds
+    except FileExistsError:
+        stored = load_calibrated_rounds(path)
+        if stored is not None:
+            return stored
+    except OSError as e:
+        logger.warning("Не удалось сохранить стоимость bcrypt в %s: %s", path, e)
+        return rounds
+    
+    # Файл от других настроек: заменяем целиком
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "w") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning("Не удалось сохранить стоимость bcrypt в %s: %s", path, e)
+    return rounds
+
+
+async def configure_password_hashing() -> int:
+    """Стоимость bcrypt при запуске: из настроек, из сохраненной калибровки или по новой.
+
+    Калибровка сохраняется в PASSWORD_HASH_CALIBRATION_FILE и при следующих
+    запусках не повторяется: замер мог бы дать соседнюю стоимость, и тогда
+    needs_update() пересчитывал бы хеши всех входящих пользователей.
+    """
+    if settings.PASSWORD_HASH_ROUNDS:
+        password_hasher.configure_rounds(settings.PASSWORD_HASH_ROUNDS)
+        return settings.PASSWORD_HASH_ROUNDS
+    
+    path = settings.PASSWORD_HASH_CALIBRATION_FILE
+    stored = load_calibrated_rounds(path) if path else None
+    if stored is not None:
+        password_hasher.configure_rounds(stored)
+        logger.info("Стоимость bcrypt: %s (из %s)", stored, path)
+        return stored
+    
+    rounds = await password_hasher.calibrate(
+        settings.PASSWORD_HASH_TARGET_MS,
+        settings.PASSWORD_HASH_MIN_ROUNDS,
+        settings.PASSWORD_HASH_MAX_ROUNDS,
+    )
+    if path:
+        saved = store_calibrated_rounds(path, rounds)
+        if saved != rounds:
+            password_hasher.configure_rounds(saved)
+        rounds = saved
+    return rounds
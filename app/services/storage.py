@@ -1,13 +1,95 @@
 """
 Сервис для работы с файлами
 """
+import asyncio
+import glob
+import hashlib
+import logging
 import os
-import shutil
+import re
+import time
 import uuid
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
 from fastapi import UploadFile
 
 from app.core.config import settings
+from app.core.executors import file_io_bulkhead, image_process_pool
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow не установлен: производные изображения не создаются
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Каталог производных изображений рядом с оригиналами
+VARIANTS_DIRNAME = "variants"
+
+# Хранилище по содержимому: uploads/cas/<первые 2 символа sha256>/<sha256><расширение>.
+# Ссылки автомобилей — жесткие ссылки uploads/<car_id>/<sha256><расширение> на тот же файл,
+# поэтому число ссылок на inode и есть счетчик использований
+CAS_DIRNAME = "cas"
+_DIGEST_NAME_RE = re.compile(r"^[0-9a-f]{64}(\.[A-Za-z0-9]+)?$")
+
+# Размер блока при хешировании уже сохраненных файлов
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def _file_sha256(file_path: str) -> str:
+    """SHA-256 файла на диске"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while block := f.read(_HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Форматы производных изображений и их расширения
+VARIANT_FORMATS = {"webp": ".webp", "jpeg": ".jpg"}
+
+
+def render_image_variants(source_path: str, target_dir: str, widths: List[int],
+                          webp_quality: int, jpeg_quality: int) -> List[Dict[str, Any]]:
+    """Уменьшенные копии изображения заданной ширины в WebP и JPEG.
+
+    Выполняется в пуле процессов. Ширины больше оригинала пропускаются;
+    если оригинал уже меньше всех ширин, создается одна копия его размера.
+    Возвращает [{"width", "webp", "jpeg"}] с путями в файловой системе.
+    """
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    
+    with Image.open(source_path) as original:
+        # JPEG декодируется сразу в уменьшенном масштабе, если это возможно
+        original.draft("RGB", (max(widths), max(widths)))
+        image = ImageOps.exif_transpose(original).convert("RGB")
+    
+    os.makedirs(target_dir, exist_ok=True)
+    target_widths = sorted(width for width in widths if width < image.width) or [image.width]
+    variants = []
+    for width in target_widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        variant: Dict[str, Any] = {"width": width}
+        for image_format, extension in VARIANT_FORMATS.items():
+            path = os.path.join(target_dir, f"{stem}_{width}{extension}")
+            if image_format == "webp":
+                resized.save(path, "WEBP", quality=webp_quality, method=4)
+            else:
+                resized.save(path, "JPEG", quality=jpeg_quality, optimize=True, progressive=True)
+            variant[image_format] = path
+        variants.append(variant)
+    return variants
+
+
+class FileUploadError(Exception):
+    """Ошибка сохранения одного из файлов загрузки"""
+    
+    def __init__(self, filename: Optional[str], reason: Exception):
+        super().__init__(f"Ошибка загрузки файла {filename}: {reason}")
+        self.filename = filename
+        self.reason = reason
 
 
 class StorageService:
@@ -17,101 +99,426 @@ class StorageService:
         self.upload_dir = settings.UPLOAD_DIR
         self.temp_upload_dir = settings.TEMP_UPLOAD_DIR
         self.max_file_size = settings.MAX_FILE_SIZE
+        self.chunk_size = settings.UPLOAD_CHUNK_SIZE
+        self.upload_concurrency = settings.UPLOAD_CONCURRENCY
         
         # Создаем директории если их нет
         os.makedirs(self.upload_dir, exist_ok=True)
         os.makedirs(self.temp_upload_dir, exist_ok=True)
     
-    def _generate_filename(self, original_filename: str) -> str:
-        """Генерация уникального имени файла"""
-        file_extension = os.path.splitext(original_filename)[1]
-        unique_id = str(uuid.uuid4())
-        return f"{unique_id}{file_extension}"
-    
     def _get_public_path(self, file_path: str) -> str:
         """Получение публичного пути к файлу"""
         return f"/uploads/{os.path.relpath(file_path, self.upload_dir)}"
     
-    def save_file(self, car_id: int, file: UploadFile) -> str:
-        """Сохранение файла для конкретного автомобиля"""
-        # Проверяем размер файла
+    def _get_file_path(self, public_path: str) -> str:
+        """Путь в файловой системе по публичному пути /uploads/..."""
+        relative_path = public_path.replace("/uploads/", "")
+        return os.path.join(self.upload_dir, relative_path)
+    
+    def _cas_file_path(self, digest: str, extension: str) -> str:
+        """Путь объекта в хранилище по содержимому"""
+        return os.path.join(self.upload_dir, CAS_DIRNAME, digest[:2], f"{digest}{extension.lower()}")
+    
+    def _is_cas_path(self, public_path: str) -> bool:
+        return public_path.startswith(f"/uploads/{CAS_DIRNAME}/")
+    
+    def _resolve_cas_path(self, public_path: str) -> Optional[str]:
+        """Путь объекта хранилища по содержимому для публичного пути.
+
+        Пути приходят от клиента (список изображений автомобиля), поэтому
+        принимается только канонический путь uploads/cas/<hh>/<sha256><ext>,
+        который и после разрешения ссылок остается внутри uploads/cas.
+        Для любого другого пути возвращается None.
+        """
+        name = os.path.basename(public_path)
+        if not self._is_cas_path(public_path) or not _DIGEST_NAME_RE.match(name):
+            return None
+        stem, extension = os.path.splitext(name)
+        cas_path = self._cas_file_path(stem, extension)
+        if self._get_public_path(cas_path) != public_path:
+            return None
+        cas_root = os.path.realpath(os.path.join(self.upload_dir, CAS_DIRNAME))
+        if os.path.commonpath([cas_root, os.path.realpath(cas_path)]) != cas_root:
+            return None
+        return cas_path
+    
+    async def _write_upload(self, file: UploadFile, file_path: str) -> Tuple[int, str]:
+        """Потоковая запись загруженного файла кусками UPLOAD_CHUNK_SIZE.
+
+        Размер проверяется по мере записи: слишком большой файл обрывается
+        на первом лишнем куске, частично записанный файл удаляется.
+        Возвращает размер и SHA-256 содержимого.
+        """
+        # Размер из multipart известен не всегда, но если известен — отказываем сразу
         if file.size and file.size > self.max_file_size:
             raise ValueError("Файл слишком большой")
         
-        # Создаем директорию для автомобиля
-        car_dir = os.path.join(self.upload_dir, str(car_id))
-        os.makedirs(car_dir, exist_ok=True)
-        
-        # Генерируем имя файла
-        filename = self._generate_filename(file.filename)
-        file_path = os.path.join(car_dir, filename)
+        written = 0
+        digest = hashlib.sha256()
+        try:
+            async with aiofiles.open(file_path, "wb") as buffer:
+                while chunk := await file.read(self.chunk_size):
+                    written += len(chunk)
+                    if written > self.max_file_size:
+                        raise ValueError("Файл слишком большой")
+                    digest.update(chunk)
+                    await buffer.write(chunk)
+        except BaseException:
+            try:
+                await aiofiles.os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            raise
         
-        # Сохраняем файл
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        return written, digest.hexdigest()
+    
+    def _partial_path(self) -> str:
+        """Имя для файла, который еще пишется (в каталоге временных загрузок)"""
+        return os.path.join(self.temp_upload_dir, f".{uuid.uuid4()}.part")
+    
+    def _link_car_ref(self, car_id: int, source_path: str, digest: str, extension: str) -> Tuple[str, bool]:
+        """Добавление объекта в хранилище и ссылки на него от автомобиля.
+
+        source_path остается на месте — его удаляет вызывающий. Если такой же
+        объект уже есть, новый файл не сохраняется (дедупликация).
+        Возвращает публичный путь и признак того, что ссылку создал этот вызов
+        (False — автомобиль уже ссылался на этот объект).
+        """
+        cas_path = self._cas_file_path(digest, extension)
+        ref_path = os.path.join(self.upload_dir, str(car_id), os.path.basename(cas_path))
+        os.makedirs(os.path.dirname(cas_path), exist_ok=True)
+        os.makedirs(os.path.dirname(ref_path), exist_ok=True)
         
-        return self._get_public_path(file_path)
+        while True:
+            try:
+                os.link(source_path, cas_path)
+            except FileExistsError:
+                pass
+            try:
+                os.link(cas_path, ref_path)
+            except FileExistsError:
+                return self._get_public_path(cas_path), False
+            except FileNotFoundError:
+                # Объект удалили как неиспользуемый между двумя шагами — повторяем
+                continue
+            return self._get_public_path(cas_path), True
+    
+    def _ingest_car_file(self, car_id: int, part_path: str, digest: str, extension: str) -> Tuple[str, bool]:
+        """Перенос записанного файла в хранилище по содержимому"""
+        try:
+            return self._link_car_ref(car_id, part_path, digest, extension)
+        finally:
+            os.remove(part_path)
     
-    def save_temp_file(self, file: UploadFile) -> str:
+    def _ingest_temp_file(self, part_path: str, digest: str, extension: str) -> Tuple[str, bool]:
+        """Временный файл с именем по хешу: повторная загрузка того же файла не дублируется"""
+        file_path = os.path.join(self.temp_upload_dir, f"{digest}{extension.lower()}")
+        created = True
+        try:
+            os.link(part_path, file_path)
+        except FileExistsError:
+            # Продлеваем жизнь уже загруженной копии для очистки по времени
+            os.utime(file_path)
+            created = False
+        finally:
+            os.remove(part_path)
+        return self._get_public_path(file_path), created
+    
+    async def _save_upload(self, file: UploadFile, car_id: Optional[int]) -> Tuple[str, bool]:
+        """Запись загрузки и перенос ее к автомобилю (или во временные).
+
+        Возвращает публичный путь и признак того, что файл или ссылку создала
+        эта загрузка, а не более ранняя загрузка того же содержимого.
+        """
+        part_path = self._partial_path()
+        _, digest = await self._write_upload(file, part_path)
+        extension = os.path.splitext(file.filename or "")[1]
+        if car_id is None:
+            return await file_io_bulkhead.run(self._ingest_temp_file, part_path, digest, extension)
+        return await file_io_bulkhead.run(self._ingest_car_file, car_id, part_path, digest, extension)
+    
+    async def save_file(self, car_id: int, file: UploadFile) -> str:
+        """Сохранение файла для конкретного автомобиля (в хранилище по содержимому)"""
+        public_path, _ = await self._save_upload(file, car_id)
+        return public_path
+    
+    async def save_temp_file(self, file: UploadFile) -> str:
         """Сохранение временного файла"""
-        # Проверяем размер файла
-        if file.size and file.size > self.max_file_size:
-            raise ValueError("Файл слишком большой")
+        public_path, _ = await self._save_upload(file, None)
+        return public_path
+    
+    async def save_files(self, files: List[UploadFile], car_id: Optional[int] = None) -> List[str]:
+        """Параллельное сохранение нескольких файлов (не более UPLOAD_CONCURRENCY одновременно).
+
+        Пути возвращаются в порядке исходных файлов. Если хотя бы один файл
+        не сохранился, записанные этой загрузкой файлы и ссылки удаляются
+        (существовавшие до нее остаются) и выбрасывается FileUploadError.
+        """
+        semaphore = asyncio.Semaphore(self.upload_concurrency)
+        
+        async def save_one(file: UploadFile) -> Tuple[str, bool]:
+            async with semaphore:
+                return await self._save_upload(file, car_id)
         
-        # Генерируем имя файла
-        filename = self._generate_filename(file.filename)
-        file_path = os.path.join(self.temp_upload_dir, filename)
+        results = await asyncio.gather(*(save_one(file) for file in files), return_exceptions=True)
         
-        # Сохраняем файл
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        saved = [result for result in results if not isinstance(result, BaseException)]
+        for file, result in zip(files, results):
+            if isinstance(result, BaseException):
+                created_paths = [public_path for public_path, created in saved if created]
+                if car_id is None:
+                    await file_io_bulkhead.run(self.delete_by_public_paths, created_paths)
+                else:
+                    await file_io_bulkhead.run(self.release_car_files, car_id, created_paths)
+                raise FileUploadError(file.filename, result)
         
-        return self._get_public_path(file_path)
+        return [public_path for public_path, _ in saved]
     
-    def move_temp_to_car(self, car_id: int, temp_paths: List[str]) -> List[str]:
-        """Перемещение временных файлов к автомобилю"""
-        car_dir = os.path.join(self.upload_dir, str(car_id))
-        os.makedirs(car_dir, exist_ok=True)
+    async def generate_variants(self, public_paths: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Производные изображения для загруженных файлов (в пуле процессов).
+
+        Возвращает {публичный путь оригинала: [{"width", "webp", "jpeg"}]} с
+        публичными путями копий. Файлы, которые не удалось обработать
+        (не изображения, битые файлы), пропускаются.
+        """
+        if Image is None or not settings.IMAGE_VARIANTS_ENABLED:
+            return {}
+        
+        async def render(public_path: str) -> List[Dict[str, Any]]:
+            file_path = self._get_file_path(public_path)
+            target_dir = os.path.join(os.path.dirname(file_path), VARIANTS_DIRNAME)
+            # Одинаковое содержимое — одни и те же копии: повторно не пересчитываем
+            existing = self._existing_variants(file_path)
+            if existing:
+                return existing
+            return await image_process_pool.run(
+                render_image_variants,
+                file_path,
+                target_dir,
+                settings.IMAGE_VARIANT_WIDTHS,
+                settings.IMAGE_WEBP_QUALITY,
+                settings.IMAGE_JPEG_QUALITY,
+            )
+        
+        results = await asyncio.gather(*(render(path) for path in public_paths), return_exceptions=True)
         
+        variants: Dict[str, List[Dict[str, Any]]] = {}
+        for public_path, result in zip(public_paths, results):
+            if isinstance(result, BaseException):
+                logger.warning("Не удалось создать копии изображения %s: %s", public_path, result)
+                continue
+            variants[public_path] = [
+                {
+                    key: self._get_public_path(value) if key in VARIANT_FORMATS else value
+                    for key, value in variant.items()
+                }
+                for variant in result
+            ]
+        return variants
+    
+    def _existing_variants(self, file_path: str) -> List[Dict[str, Any]]:
+        """Уже созданные копии объекта хранилища по содержимому"""
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        if not _DIGEST_NAME_RE.match(stem):
+            return []
+        variants_dir = os.path.join(os.path.dirname(file_path), VARIANTS_DIRNAME)
+        by_width: Dict[int, Dict[str, Any]] = {}
+        for variant_path in glob.glob(os.path.join(variants_dir, f"{stem}_*")):
+            name, extension = os.path.splitext(os.path.basename(variant_path))
+            width = name.rsplit("_", 1)[1]
+            for image_format, format_extension in VARIANT_FORMATS.items():
+                if extension == format_extension and width.isdigit():
+                    by_width.setdefault(int(width), {"width": int(width)})[image_format] = variant_path
+        return [
+            variant for _, variant in sorted(by_width.items())
+            if all(image_format in variant for image_format in VARIANT_FORMATS)
+        ]
+    
+    def delete_variants(self, public_paths: List[str]) -> int:
+        """Удаление производных изображений для указанных оригиналов.
+
+        Копии объекта хранилища по содержимому общие для всех автомобилей и
+        удаляются только вместе с самим объектом.
+        """
+        deleted_count = 0
+        for public_path in public_paths:
+            file_path = self._get_file_path(public_path)
+            if self._is_cas_path(public_path) and os.path.exists(file_path):
+                continue
+            stem = os.path.splitext(os.path.basename(file_path))[0]
+            pattern = os.path.join(os.path.dirname(file_path), VARIANTS_DIRNAME, f"{glob.escape(stem)}_*")
+            for variant_path in glob.glob(pattern):
+                os.remove(variant_path)
+                deleted_count += 1
+        return deleted_count
+    
+    def move_temp_to_car(self, car_id: int, temp_paths: List[str]) -> List[str]:
+        """Перенос временных файлов в хранилище по содержимому со ссылками от автомобиля"""
         moved_paths = []
+        temp_root = os.path.realpath(self.temp_upload_dir)
         for temp_path in temp_paths:
-            # Получаем относительный путь от /uploads
-            relative_path = temp_path.replace("/uploads/", "")
-            temp_file_path = os.path.join(self.upload_dir, relative_path)
+            temp_file_path = self._get_file_path(temp_path)
+            stem, extension = os.path.splitext(os.path.basename(temp_file_path))
+            # Переносятся только файлы из каталога временных загрузок
+            if os.path.dirname(os.path.realpath(temp_file_path)) != temp_root:
+                continue
             
-            if os.path.exists(temp_file_path):
-                # Генерируем новое имя файла
-                filename = self._generate_filename(os.path.basename(temp_file_path))
-                new_file_path = os.path.join(car_dir, filename)
-                
-                # Перемещаем файл
-                shutil.move(temp_file_path, new_file_path)
-                moved_paths.append(self._get_public_path(new_file_path))
+            if os.path.isfile(temp_file_path):
+                # Временные файлы старого формата (uuid) хешируются при переносе
+                digest = stem if _DIGEST_NAME_RE.match(stem) else _file_sha256(temp_file_path)
+                moved_paths.append(self._link_car_ref(car_id, temp_file_path, digest, extension)[0])
+                os.remove(temp_file_path)
+            elif _DIGEST_NAME_RE.match(stem) and os.path.exists(self._cas_file_path(stem, extension)):
+                # Тот же файл уже перенесен другим автомобилем
+                moved_paths.append(self._link_car_ref(car_id, self._cas_file_path(stem, extension), stem, extension)[0])
         
         return moved_paths
     
+    def _release_cas_object(self, cas_path: str) -> bool:
+        """Удаление объекта хранилища и его копий, если на него не осталось ссылок"""
+        try:
+            if os.stat(cas_path).st_nlink > 1:
+                return False
+            os.remove(cas_path)
+        except FileNotFoundError:
+            return False
+        self.delete_variants([self._get_public_path(cas_path)])
+        return True
+    
+    def release_car_files(self, car_id: int, public_paths: List[str]) -> int:
+        """Снятие ссылок автомобиля на объекты; неиспользуемые объекты удаляются"""
+        deleted_count = 0
+        car_dir = os.path.join(self.upload_dir, str(car_id))
+        for public_path in public_paths:
+            cas_path = self._resolve_cas_path(public_path)
+            if cas_path is None:
+                continue
+            try:
+                os.remove(os.path.join(car_dir, os.path.basename(cas_path)))
+            except FileNotFoundError:
+                pass
+            if self._release_cas_object(cas_path):
+                deleted_count += 1
+        return deleted_count
+    
+    def sync_car_refs(self, car_id: int, images: List[str]) -> int:
+        """Приведение ссылок автомобиля к его текущему списку изображений.
+
+        Недостающие ссылки создаются, лишние снимаются (объекты без ссылок
+        удаляются). Файлы старого формата в каталоге автомобиля не трогаются.
+        """
+        car_dir = os.path.join(self.upload_dir, str(car_id))
+        wanted = {}
+        for public_path in images:
+            cas_path = self._resolve_cas_path(public_path)
+            if cas_path is not None:
+                wanted[os.path.basename(cas_path)] = cas_path
+        
+        for name, cas_path in wanted.items():
+            ref_path = os.path.join(car_dir, name)
+            if os.path.exists(cas_path) and not os.path.exists(ref_path):
+                os.makedirs(car_dir, exist_ok=True)
+                try:
+                    os.link(cas_path, ref_path)
+                except FileExistsError:
+                    pass
+        
+        stale = []
+        if os.path.isdir(car_dir):
+            with os.scandir(car_dir) as entries:
+                for entry in entries:
+                    if entry.is_file() and _DIGEST_NAME_RE.match(entry.name) and entry.name not in wanted:
+                        stem, extension = os.path.splitext(entry.name)
+                        stale.append(self._get_public_path(self._cas_file_path(stem, extension)))
+        return self.release_car_files(car_id, stale)
+    
     def delete_by_public_paths(self, public_paths: List[str]) -> int:
-        """Удаление файлов по публичным путям"""
+        """Удаление файлов по публичным путям.
+
+        Объекты хранилища по содержимому удаляются, только если на них не
+        ссылается ни один автомобиль.
+        """
         deleted_count = 0
+        legacy_paths = []
         for public_path in public_paths:
-            # Получаем относительный путь от /uploads
-            relative_path = public_path.replace("/uploads/", "")
-            file_path = os.path.join(self.upload_dir, relative_path)
+            file_path = self._get_file_path(public_path)
             
+            if self._is_cas_path(public_path):
+                cas_path = self._resolve_cas_path(public_path)
+                if cas_path is not None and self._release_cas_object(cas_path):
+                    deleted_count += 1
+                continue
+            
+            legacy_paths.append(public_path)
             if os.path.exists(file_path):
                 os.remove(file_path)
                 deleted_count += 1
         
+        # Вместе с оригиналами удаляем их уменьшенные копии
+        self.delete_variants(legacy_paths)
+        
         return deleted_count
     
-    def cleanup_temp_files(self) -> int:
-        """Очистка временных файлов"""
-        deleted_count = 0
-        if os.path.exists(self.temp_upload_dir):
-            for filename in os.listdir(self.temp_upload_dir):
-                file_path = os.path.join(self.temp_upload_dir, filename)
-                if os.path.isfile(file_path):
-                    os.remove(file_path)
-                    deleted_count += 1
+    def scan_temp_dir(self) -> Optional[Iterator[os.DirEntry]]:
+        """Итератор по каталогу временных загрузок (None, если каталога нет)"""
+        if not os.path.isdir(self.temp_upload_dir):
+            return None
+        return os.scandir(self.temp_upload_dir)
+    
+    def sweep_temp_files(self, entries: Iterator[os.DirEntry], ttl_seconds: float,
+                         batch_size: int) -> Dict[str, int]:
+        """Удаление временных файлов старше ttl_seconds среди следующих batch_size записей.
+
+        Просматривается не больше batch_size записей за вызов; следующий вызов
+        с тем же итератором продолжает с места остановки. Возраст считается
+        по mtime: повторная загрузка того же файла его обновляет.
+        Возвращает счетчики пачки; more=1, если каталог просмотрен не до конца.
+        """
+        result = {"scanned": 0, "deleted": 0, "freed_bytes": 0, "errors": 0, "more": 0}
+        expire_before = time.time() - ttl_seconds
+        for entry in entries:
+            result["scanned"] += 1
+            try:
+                if entry.is_file(follow_symlinks=False):
+                    stat_result = entry.stat(follow_symlinks=False)
+                    if stat_result.st_mtime < expire_before:
+                        os.remove(entry.path)
+                        result["deleted"] += 1
+                        result["freed_bytes"] += stat_result.st_size
+            except FileNotFoundError:
+                pass
+            except OSError:
+                result["errors"] += 1
+            if result["scanned"] >= batch_size:
+                result["more"] = 1
+                break
         
-        return deleted_count
+        return result
+
+
+async def sweep_temp_uploads(
+    ttl_seconds: float = settings.TEMP_UPLOAD_TTL_SECONDS,
+    batch_size: int = settings.TEMP_UPLOAD_SWEEP_BATCH_SIZE,
+) -> Dict[str, int]:
+    """Фоновая очистка временных загрузок пачками в пуле файловых операций.
+
+    Каталог проходится один раз за запуск: пачки продолжают общий итератор,
+    а не просматривают каталог заново с начала.
+    """
+    storage_service = StorageService()
+    totals = {"scanned": 0, "deleted": 0, "freed_bytes": 0, "errors": 0, "batches": 0}
+    entries = await file_io_bulkhead.run(storage_service.scan_temp_dir)
+    if entries is None:
+        return totals
+    
+    try:
+        while True:
+            result = await file_io_bulkhead.run(storage_service.sweep_temp_files, entries, ttl_seconds, batch_size)
+            totals["batches"] += 1
+            for key in ("scanned", "deleted", "freed_bytes", "errors"):
+                totals[key] += result[key]
+            if not result["more"]:
+                return totals
+            await asyncio.sleep(0)
+    finally:
+        entries.close()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Скрипт для массового создания пользователей из CSV или JSONL файла
+Использование: python bulk_create_users.py <file.csv|file.jsonl> [--workers N]
+
+CSV — заголовок username,password; JSONL — по объекту {"username", "password"} на строку.
+Роли не импортируются: пользователи создаются с ролью по умолчанию, как в create_user.py.
+Пароли хешируются параллельно в пуле процессов с той же стоимостью bcrypt, что и у приложения
+(PASSWORD_HASH_ROUNDS или сохраненная калибровка), пользователи добавляются одной транзакцией.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.user import User
+from app.models.refresh_token import RefreshToken  # noqa: F401 — связь User.refresh_tokens
+from app.services.password import hash_password, password_hasher
+
+# Запас до лимита переменных SQLite в одном запросе
+EXISTENCE_CHECK_CHUNK = 900
+
+
+def read_users(path: Path) -> List[Dict[str, str]]:
+    """Чтение записей пользователей из CSV или JSONL"""
+    with path.open(encoding="utf-8") as f:
+        if path.suffix.lower() == ".csv":
+            return [dict(row) for row in csv.DictReader(f)]
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def validate_users(rows: List[Dict[str, str]]) -> Tuple[List[Dict[str, str]], List[str]]:
+    """Проверка записей по тем же правилам, что и create_user.py"""
+    valid: List[Dict[str, str]] = []
+    errors: List[str] = []
+    seen: Set[str] = set()
+    
+    for line_number, row in enumerate(rows, start=1):
+        username = (row.get("username") or "").strip()
+        password = row.get("password") or ""
+        if len(username) < 3:
+            errors.append(f"#{line_number}: имя пользователя должно содержать минимум 3 символа")
+            continue
+        if len(password) < 6:
+            errors.append(f"#{line_number} ({username}): пароль должен содержать минимум 6 символов")
+            continue
+        if username in seen:
+            errors.append(f"#{line_number} ({username}): повтор в файле")
+            continue
+        seen.add(username)
+        valid.append({
+            "username": username,
+            # Обрезаем пароль до 72 байт для bcrypt, как UserCreate
+            "password": password.encode("utf-8")[:72].decode("utf-8", errors="ignore"),
+        })
+    
+    return valid, errors
+
+
+def find_existing_usernames(db: Session, usernames: List[str]) -> Set[str]:
+    """Имена, уже занятые в БД (один IN-запрос на пачку имен)"""
+    existing: Set[str] = set()
+    for start in range(0, len(usernames), EXISTENCE_CHECK_CHUNK):
+        chunk = usernames[start:start + EXISTENCE_CHECK_CHUNK]
+        existing.update(db.execute(select(User.username).filter(User.username.in_(chunk))).scalars())
+    return existing
+
+
+def hash_passwords(passwords: List[str], rounds: int, workers: int) -> List[str]:
+    """Параллельное хеширование паролей на всех ядрах"""
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(hash_password, passwords, [rounds] * len(passwords), chunksize=chunksize))
+
+
+def bulk_create_users(path: Path, workers: int, rounds: int) -> bool:
+    """Массовое создание пользователей"""
+    started_at = time.perf_counter()
+    users, errors = validate_users(read_users(path))
+    for error in errors:
+        print(f"⚠️  Пропущено {error}")
+    
+    db: Session = SessionLocal()
+    try:
+        existing = find_existing_usernames(db, [user["username"] for user in users])
+        for username in sorted(existing):
+            print(f"⚠️  Пропущено ({username}): пользователь уже существует")
+        users = [user for user in users if user["username"] not in existing]
+        
+        if not users:
+            print("ℹ️  Нет новых пользователей для создания")
+            return not errors and not existing
+        
+        print(f"🔄 Хешируем {len(users)} паролей (bcrypt, стоимость {rounds}, процессов: {workers})...")
+        hash_started_at = time.perf_counter()
+        hashes = hash_passwords([user["password"] for user in users], rounds, workers)
+        hash_seconds = time.perf_counter() - hash_started_at
+        
+        insert_started_at = time.perf_counter()
+        db.execute(insert(User), [
+            {"username": user["username"], "password": hashed}
+            for user, hashed in zip(users, hashes)
+        ])
+        db.commit()
+        insert_seconds = time.perf_counter() - insert_started_at
+        
+        total_seconds = time.perf_counter() - started_at
+        print(f"✅ Создано пользователей: {len(users)}")
+        print(f"   Хеширование: {hash_seconds:.2f} с ({len(users) / hash_seconds:.1f} паролей/с)")
+        print(f"   Запись в БД: {insert_seconds:.3f} с")
+        print(f"   Всего: {total_seconds:.2f} с ({len(users) / total_seconds:.1f} пользователей/с)")
+        return True
+        
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Ошибка при создании пользователей: {e}")
+        return False
+    finally:
+        db.close()
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Массовое создание пользователей из CSV или JSONL")
+    parser.add_argument("file", type=Path, help="CSV (username,password) или JSONL файл")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="число процессов для хеширования")
+    args = parser.parse_args()
+    
+    print("🔐 Массовое создание пользователей")
+    print("=" * 40)
+    
+    if not args.file.exists():
+        print(f"❌ Файл не найден: {args.file}")
+        sys.exit(1)
+    
+    if not bulk_create_users(args.file, args.workers, password_hasher.rounds):
+        print()
+        print("💥 Не все пользователи были созданы.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Скрипт для проверки планов частых запросов к таблице cars
+Использование: python check_query_plans.py [путь_к_базе]
+"""
+import sqlite3
+import sys
+from pathlib import Path
+
+
+# Частые запросы каталога: (название, SQL, параметры)
+HOT_QUERIES = [
+    (
+        "Популярные автомобили",
+        "SELECT * FROM cars ORDER BY rating DESC LIMIT ?",
+        (8,),
+    ),
+    (
+        "Доступные автомобили по цене",
+        "SELECT * FROM cars WHERE available = ? ORDER BY price LIMIT ?",
+        (1, 50),
+    ),
+    (
+        "Доступные автомобили по рейтингу",
+        "SELECT * FROM cars WHERE available = ? ORDER BY rating DESC LIMIT ?",
+        (1, 50),
+    ),
+    (
+        "Фильтр по типу топлива",
+        "SELECT * FROM cars WHERE fuel_type = ?",
+        ("petrol",),
+    ),
+    (
+        "Фильтр по категории",
+        "SELECT * FROM cars WHERE category = ?",
+        ("suv",),
+    ),
+    (
+        "Фильтр по диапазону цен",
+        "SELECT * FROM cars WHERE price BETWEEN ? AND ?",
+        (1000, 5000),
+    ),
+    (
+        "Страница по цене (keyset)",
+        "SELECT * FROM cars WHERE price IS NOT NULL AND price >= ? AND (price > ? OR id > ?) "
+        "ORDER BY price, id LIMIT ?",
+        (1000, 1000, 10, 51),
+    ),
+    (
+        "Страница по рейтингу (keyset, убывание)",
+        "SELECT * FROM cars WHERE rating IS NOT NULL AND rating <= ? AND (rating < ? OR id < ?) "
+        "ORDER BY rating DESC, id DESC LIMIT ?",
+        (4.5, 4.5, 10, 51),
+    ),
+    (
+        "Страница по дате добавления (keyset, убывание)",
+        "SELECT * FROM cars WHERE created_at IS NOT NULL AND created_at <= ? AND (created_at < ? OR id < ?) "
+        "ORDER BY created_at DESC, id DESC LIMIT ?",
+        ("2025-01-01", "2025-01-01", 10, 51),
+    ),
+    (
+        "Страница без значения сортировки (keyset)",
+        "SELECT * FROM cars WHERE price IS NULL AND id > ? ORDER BY id LIMIT ?",
+        (10, 51),
+    ),
+    (
+        "Типы топлива (meta)",
+        "SELECT DISTINCT fuel_type FROM cars WHERE fuel_type IS NOT NULL AND fuel_type != '' ORDER BY fuel_type",
+        (),
+    ),
+    (
+        "Диапазон цен (meta)",
+        "SELECT min(price), max(price) FROM cars",
+        (),
+    ),
+]
+
+
+def is_full_scan(detail: str) -> bool:
+    """Полный проход по таблице без индекса"""
+    return detail.startswith("SCAN cars") and "INDEX" not in detail
+
+
+def main():
+    """Выводит EXPLAIN QUERY PLAN для каждого частого запроса"""
+    db_path = Path(sys.argv[1] if len(sys.argv) > 1 else "baz_car.db")
+    
+    print("🔍 Планы запросов к таблице cars")
+    print("=" * 40)
+    
+    if not db_path.exists():
+        print(f"❌ База данных не найдена: {db_path}")
+        sys.exit(1)
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    full_scans = []
+    for title, sql, params in HOT_QUERIES:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        plan = [row[3] for row in cursor.fetchall()]
+        
+        has_full_scan = any(is_full_scan(detail) for detail in plan)
+        marker = "❌" if has_full_scan else "✅"
+        print(f"\n{marker} {title}")
+        print(f"   {sql}")
+        for detail in plan:
+            print(f"   → {detail}")
+        
+        if has_full_scan:
+            full_scans.append(title)
+    
+    conn.close()
+    
+    print()
+    if full_scans:
+        print(f"💥 Полный проход по таблице в {len(full_scans)} запросах:")
+        for title in full_scans:
+            print(f"   - {title}")
+        print(f"\n💡 Для создания индексов запустите:")
+        print(f"   ./auto_migrate.sh")
+        sys.exit(1)
+    
+    print("🎉 Все частые запросы используют индексы")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Общие фикстуры тестов: приложение на временной базе и каталоге загрузок
+"""
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# Настройки читаются при импорте приложения, поэтому окружение задается до него
+TEST_DIR = tempfile.mkdtemp(prefix="baz-car-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DIR}/test.db"
+os.environ["UPLOAD_DIR"] = os.path.join(TEST_DIR, "uploads")
+os.environ["TEMP_UPLOAD_DIR"] = os.path.join(TEST_DIR, "uploads", "temp")
+os.environ["PASSWORD_HASH_ROUNDS"] = "4"  # Минимальная стоимость bcrypt: тесты не ждут хеширования
+# Тесты входят много раз с одного адреса; лимиты проверяются отдельно
+os.environ["RATE_LIMIT_LOGIN_IP"] = "10000/minute"
+os.environ["RATE_LIMIT_LOGIN_USER"] = "10000/minute"
+os.environ["ETAG_DB_CHECK_INTERVAL_SECONDS"] = "0"  # Маркер изменений в БД сверяется на каждом запросе
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Клиент приложения; lifespan (БД, пулы, фоновые задачи) один на все тесты"""
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def create_user(client):
+    """Создание пользователя с уникальным именем: create_user(password) -> username"""
+    from app.core.database import SessionLocal
+    from app.schemas.user import UserCreate
+    from app.services.auth import AuthService
+
+    def _create_user(password: str = "secret1") -> str:
+        username = f"user-{uuid.uuid4().hex[:8]}"
+        db = SessionLocal()
+        try:
+            AuthService(db).create_user(UserCreate(username=username, password=password))
+        finally:
+            db.close()
+        return username
+
+    return _create_user
+
+
+@pytest.fixture
+def login(client):
+    """Вход пользователя: login(username, password) -> ответ /auth/login"""
+
+    def _login(username: str, password: str = "secret1"):
+        return client.post("/api/v1/auth/login", json={"username": username, "password": password})
+
+    return _login
+
+
+@pytest.fixture
+def auth_headers(create_user, login):
+    """Заголовок авторизации нового пользователя"""
+    response = login(create_user())
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['token']}"}
@@ -8,18 +8,44 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from app.core.config import settings
-from app.core.database import init_db
+from app.core.database import init_db, close_db
+from app.core.executors import shutdown_executors
+from app.core.rate_limit import rate_limit_store
+from app.core.static import UploadStaticFiles
+from app.core.tasks import PeriodicTask, start_tasks, stop_tasks
+from app.services.auth import reap_expired_refresh_tokens
+from app.services.storage import sweep_temp_uploads
+from app.services.password import password_hasher, configure_password_hashing
 from app.api.v1.api import api_router
 
 
+# Фоновые задачи, запускаемые вместе с приложением
+refresh_token_reaper = PeriodicTask(
+    "refresh_token_reaper",
+    settings.REFRESH_TOKEN_REAPER_INTERVAL_SECONDS,
+    reap_expired_refresh_tokens,
+)
+temp_upload_sweeper = PeriodicTask(
+    "temp_upload_sweeper",
+    settings.TEMP_UPLOAD_SWEEP_INTERVAL_SECONDS,
+    sweep_temp_uploads,
+)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Управление жизненным циклом приложения"""
     # Инициализация базы данных при запуске
     await init_db()
+    await configure_password_hashing()
+    start_tasks()
     yield
     # Очистка ресурсов при завершении
-    pass
+    await stop_tasks()
+    await close_db()
+    shutdown_executors()
+    password_hasher.shutdown()
+    rate_limit_store.close()
 
 
 # Создание FastAPI приложения
@@ -34,9 +60,9 @@ app = FastAPI(
 if os.path.exists("docs"):
     app.mount("/docs", StaticFiles(directory="docs"), name="docs")
 
-# Статические файлы для загрузок
-if os.path.exists("uploads"):
-    app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Статические файлы для загрузок (immutable кеширование, Range, сжатые копии)
+os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+app.mount("/uploads", UploadStaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
 
 # Настройка CORS
 # Добавляем домен baz-car-server.online программно
@@ -53,6 +79,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Подключение API роутеров
@@ -73,8 +100,9 @@ async def root():
                 "logout": "POST /api/v1/auth/logout"
             },
             "health": "GET /api/v1/health",
+            "metrics": "GET /api/v1/system/metrics",
             "cars": {
-                "list": "GET /api/v1/cars",
+                "list": "GET /api/v1/cars?fuel_type=&category=&available=&min_price=&max_price=&sort_by=&order=&cursor=&limit=",
                 "get": "GET /api/v1/cars/{id}",
                 "create": "POST /api/v1/cars",
                 "update": "PUT/PATCH /api/v1/cars/{id}",
@@ -0,0 +1,55 @@
+"""
+Миграция: Индексы для частых запросов к таблице cars
+Описание: Добавляет одиночные и составные индексы для сортировки по рейтингу/цене/дате
+и фильтрации по доступности, типу топлива и категории
+"""
+import sqlite3
+from pathlib import Path
+
+
+# Имена совпадают с индексами, которые создает SQLAlchemy по модели Car
+CAR_INDEXES = [
+    ("ix_cars_rating", "rating"),
+    ("ix_cars_price", "price"),
+    ("ix_cars_created_at", "created_at"),
+    ("ix_cars_fuel_type", "fuel_type"),
+    ("ix_cars_category", "category"),
+    ("ix_cars_available_price", "available, price"),
+    ("ix_cars_available_rating", "available, rating"),
+]
+
+
+def migrate() -> bool:
+    """Выполняет миграцию"""
+    db_path = Path("baz_car.db")
+    
+    if not db_path.exists():
+        print("❌ База данных не найдена!")
+        return False
+    
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        print("🔄 Создаем индексы для таблицы cars...")
+        
+        for index_name, columns in CAR_INDEXES:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON cars ({columns})")
+            print(f"   - {index_name} ({columns})")
+        
+        # Обновляем статистику, чтобы планировщик выбирал новые индексы
+        cursor.execute("ANALYZE cars")
+        
+        # Сохраняем изменения
+        conn.commit()
+        
+        print(f"✅ Создано {len(CAR_INDEXES)} индексов для таблицы cars")
+        
+        conn.close()
+        return True
+        
+    except Exception as e:
+        print(f"❌ Ошибка при миграции: {e}")
+        if 'conn' in locals():
+            conn.close()
+        return False
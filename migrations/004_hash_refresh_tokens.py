@@ -0,0 +1,88 @@
+"""
+Миграция: Хранение refresh токенов в виде SHA-256
+Описание: Заменяет колонку token на token_hash (hex SHA-256 токена), переносит
+действующие токены и добавляет индексы по user_id и expires_at для фоновой очистки
+"""
+import hashlib
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+
+REFRESH_TOKEN_INDEXES = [
+    ("ix_refresh_tokens_id", "id", False),
+    ("ix_refresh_tokens_token_hash", "token_hash", True),
+    ("ix_refresh_tokens_user_id", "user_id", False),
+    ("ix_refresh_tokens_expires_at", "expires_at", False),
+]
+
+
+def migrate() -> bool:
+    """Выполняет миграцию"""
+    db_path = Path("baz_car.db")
+    
+    if not db_path.exists():
+        print("❌ База данных не найдена!")
+        return False
+    
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        # Проверяем, выполнена ли уже миграция
+        cursor.execute("PRAGMA table_info(refresh_tokens)")
+        columns = [column[1] for column in cursor.fetchall()]
+        
+        if 'token_hash' in columns:
+            print("✅ Колонка 'token_hash' уже существует в таблице refresh_tokens")
+            conn.close()
+            return True
+        
+        print("🔄 Переводим refresh_tokens на хранение SHA-256 токенов...")
+        
+        cursor.execute("""
+            CREATE TABLE refresh_tokens_new (
+                id INTEGER NOT NULL PRIMARY KEY,
+                token_hash VARCHAR(64) NOT NULL,
+                user_id INTEGER NOT NULL REFERENCES users (id),
+                expires_at DATETIME NOT NULL,
+                created_at DATETIME
+            )
+        """)
+        
+        # Переносим только действующие токены, истекшие сразу отбрасываем
+        now = datetime.utcnow().isoformat(sep=" ")
+        cursor.execute(
+            "SELECT id, token, user_id, expires_at, created_at FROM refresh_tokens WHERE expires_at >= ?",
+            (now,)
+        )
+        rows = [
+            (row_id, hashlib.sha256(token.encode()).hexdigest(), user_id, expires_at, created_at)
+            for row_id, token, user_id, expires_at, created_at in cursor.fetchall()
+        ]
+        cursor.executemany(
+            "INSERT INTO refresh_tokens_new (id, token_hash, user_id, expires_at, created_at) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        
+        cursor.execute("DROP TABLE refresh_tokens")
+        cursor.execute("ALTER TABLE refresh_tokens_new RENAME TO refresh_tokens")
+        
+        for index_name, column, unique in REFRESH_TOKEN_INDEXES:
+            unique_sql = "UNIQUE " if unique else ""
+            cursor.execute(f"CREATE {unique_sql}INDEX IF NOT EXISTS {index_name} ON refresh_tokens ({column})")
+        
+        # Сохраняем изменения
+        conn.commit()
+        
+        print(f"✅ Перенесено {len(rows)} действующих refresh токенов")
+        print("✅ Таблица refresh_tokens хранит только SHA-256 токенов")
+        
+        conn.close()
+        return True
+        
+    except Exception as e:
+        print(f"❌ Ошибка при миграции: {e}")
+        if 'conn' in locals():
+            conn.close()
+        return False
@@ -0,0 +1,50 @@
+"""
+Миграция: Добавление поля revoked_at в таблицу refresh_tokens
+Описание: Ротированные refresh токены помечаются временем отзыва вместо удаления,
+чтобы обнаруживать их повторное использование
+"""
+import sqlite3
+from pathlib import Path
+
+
+def migrate() -> bool:
+    """Выполняет миграцию"""
+    db_path = Path("baz_car.db")
+    
+    if not db_path.exists():
+        print("❌ База данных не найдена!")
+        return False
+    
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        # Проверяем, существует ли уже колонка
+        cursor.execute("PRAGMA table_info(refresh_tokens)")
+        columns = [column[1] for column in cursor.fetchall()]
+        
+        if 'revoked_at' in columns:
+            print("✅ Колонка 'revoked_at' уже существует в таблице refresh_tokens")
+            conn.close()
+            return True
+        
+        print("🔄 Добавляем колонку 'revoked_at' в таблицу refresh_tokens...")
+        
+        cursor.execute("""
+            ALTER TABLE refresh_tokens 
+            ADD COLUMN revoked_at DATETIME
+        """)
+        
+        # Сохраняем изменения
+        conn.commit()
+        
+        print("✅ Колонка 'revoked_at' успешно добавлена!")
+        
+        conn.close()
+        return True
+        
+    except Exception as e:
+        print(f"❌ Ошибка при миграции: {e}")
+        if 'conn' in locals():
+            conn.close()
+        return False
@@ -0,0 +1,50 @@
+"""
+Миграция: Добавление поля image_variants в таблицу cars
+Описание: Добавляет колонку image_variants для уменьшенных копий изображений (WebP/JPEG для srcset)
+"""
+import sqlite3
+from pathlib import Path
+
+
+def migrate() -> bool:
+    """Выполняет миграцию"""
+    db_path = Path("baz_car.db")
+    
+    if not db_path.exists():
+        print("❌ База данных не найдена!")
+        return False
+    
+    try:
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        # Проверяем, существует ли уже колонка
+        cursor.execute("PRAGMA table_info(cars)")
+        columns = [column[1] for column in cursor.fetchall()]
+        
+        if 'image_variants' in columns:
+            print("✅ Колонка 'image_variants' уже существует в таблице cars")
+            conn.close()
+            return True
+        
+        print("🔄 Добавляем колонку 'image_variants' в таблицу cars...")
+        
+        cursor.execute("""
+            ALTER TABLE cars 
+            ADD COLUMN image_variants JSON
+        """)
+        
+        # Сохраняем изменения
+        conn.commit()
+        
+        print("✅ Колонка 'image_variants' успешно добавлена!")
+        print("ℹ️  Копии для уже загруженных изображений создаются при следующей загрузке")
+        
+        conn.close()
+        return True
+        
+    except Exception as e:
+        print(f"❌ Ошибка при миграции: {e}")
+        if 'conn' in locals():
+            conn.close()
+        return False
@@ -0,0 +1,130 @@
+"""
+Тесты аутентификации: вход, refresh токены и отзыв access токенов
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, SessionLocal, async_engine
+from app.models.user import User
+from app.services.auth import AsyncAuthService, refresh_rotation_cache
+from app.services.password import password_hasher
+
+
+def test_login_verifies_password_without_writer_connection(create_user, login, monkeypatch):
+    """Пока идет bcrypt, соединение-писатель свободно"""
+    username = create_user()
+    checked_out = []
+    original_verify = password_hasher.verify
+
+    async def verify(password, hashed_password):
+        checked_out.append(async_engine.sync_engine.pool.checkedout())
+        return await original_verify(password, hashed_password)
+
+    monkeypatch.setattr(password_hasher, "verify", verify)
+    response = login(username)
+
+    assert response.status_code == 200, response.text
+    assert checked_out == [0]
+
+
+def test_login_rehashes_password_with_new_cost(create_user, login):
+    username = create_user()
+    rounds = password_hasher.rounds
+    password_hasher.configure_rounds(rounds + 1)
+    try:
+        assert login(username).status_code == 200
+    finally:
+        password_hasher.configure_rounds(rounds)
+
+    db = SessionLocal()
+    try:
+        hashed_password = db.query(User).filter(User.username == username).one().password
+    finally:
+        db.close()
+    assert hashed_password.startswith(f"$2b${rounds + 1:02d}$")
+
+
+def test_login_rejects_wrong_password(create_user, login):
+    username = create_user()
+    assert login(username, "wrong-password").status_code == 401
+
+
+def test_principal_cache_is_reset_after_commit(client, create_user, login):
+    username = create_user()
+    headers = {"Authorization": f"Bearer {login(username).json()['token']}"}
+    assert client.get("/api/v1/auth/profile", headers=headers).status_code == 200
+
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.username == username).one().is_active = False
+        db.flush()
+        # Незафиксированное изменение: запрос видит (и кеширует) прежнюю строку
+        assert client.get("/api/v1/auth/profile", headers=headers).status_code == 200
+        db.commit()
+    finally:
+        db.close()
+
+    assert client.get("/api/v1/auth/profile", headers=headers).status_code == 401
+
+
+def test_concurrent_refresh_with_same_token_gets_same_rotation(client, create_user, login):
+    """Несколько вкладок обновляют токен одновременно: все получают один новый токен"""
+    refresh_token = login(create_user()).json()["refresh_token"]
+
+    async def rotate():
+        async with AsyncSessionLocal() as db:
+            return await AsyncAuthService(db).rotate_refresh_token(refresh_token)
+
+    async def rotate_concurrently():
+        return await asyncio.gather(*(rotate() for _ in range(3)))
+
+    results = client.portal.call(rotate_concurrently)
+
+    assert None not in results
+    assert len(set(results)) == 1
+
+
+def test_concurrent_refresh_requests_all_succeed(client, create_user, login):
+    refresh_token = login(create_user()).json()["refresh_token"]
+
+    def refresh(_):
+        return client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        responses = list(pool.map(refresh, range(3)))
+
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert len({response.json()["refresh_token"] for response in responses}) == 1
+
+
+def test_refresh_token_reuse_after_grace_revokes_all_tokens(client, create_user, login, monkeypatch):
+    refresh_token = login(create_user()).json()["refresh_token"]
+    rotated = client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token}).json()["refresh_token"]
+
+    # Окно гонки вкладок прошло: повтор старого токена — признак утечки
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_REUSE_GRACE_SECONDS", 0)
+    refresh_rotation_cache.clear()
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token}).status_code == 401
+
+    # Вместе со старым отозван и выданный при ротации
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": rotated}).status_code == 401
+
+
+def test_logout_revokes_access_token(client, create_user, login):
+    username = create_user()
+    response = login(username)
+    headers = {"Authorization": f"Bearer {response.json()['token']}"}
+    assert client.get("/api/v1/auth/profile", headers=headers).status_code == 200
+
+    assert client.post("/api/v1/auth/logout", headers=headers).status_code == 204
+
+    # Токен еще не истек, но отозван по jti
+    assert client.get("/api/v1/auth/profile", headers=headers).status_code == 401
+    refresh_token = response.json()["refresh_token"]
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token}).status_code == 401
+
+    fresh = login(username)
+    assert fresh.status_code == 200, fresh.text
+    fresh_headers = {"Authorization": f"Bearer {fresh.json()['token']}"}
+    assert client.get("/api/v1/auth/profile", headers=fresh_headers).status_code == 200
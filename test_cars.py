@@ -0,0 +1,113 @@
+"""
+Тесты каталога автомобилей: список, пагинация и условные запросы
+"""
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def category():
+    """Уникальная категория: тесты видят в списке только свои автомобили"""
+    return f"cat-{uuid.uuid4().hex[:8]}"
+
+
+def create_cars(client, headers, category, prices):
+    ids = []
+    for index, price in enumerate(prices):
+        response = client.post(
+            "/api/v1/cars/",
+            json={"name": f"car{index}", "price": price, "category": category, "fuel_type": "gas"},
+            headers=headers,
+        )
+        assert response.status_code == 201, response.text
+        ids.append(response.json()["id"])
+    return ids
+
+
+def test_cars_list_without_limit_returns_all(client, auth_headers, category):
+    ids = create_cars(client, auth_headers, category, [1000] * 55)
+
+    response = client.get("/api/v1/cars/", params={"category": category})
+
+    assert response.status_code == 200
+    assert [car["id"] for car in response.json()] == ids
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_cars_keyset_pagination_walks_all_pages(client, auth_headers, category):
+    prices = [3000, 1000, 2000, 1000, 5000, 4000, 2000]
+    ids = create_cars(client, auth_headers, category, prices)
+    expected = [car_id for _, car_id in sorted(zip(prices, ids))]
+
+    seen = []
+    params = {"category": category, "sort_by": "price", "limit": 3}
+    while True:
+        response = client.get("/api/v1/cars/", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 3
+        seen.extend(car["id"] for car in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params["cursor"] = cursor
+
+    assert seen == expected
+
+
+def test_cars_cursor_without_limit_uses_default_page(client, auth_headers, category):
+    create_cars(client, auth_headers, category, [1000] * 3)
+    first = client.get("/api/v1/cars/", params={"category": category, "limit": 1})
+
+    response = client.get("/api/v1/cars/", params={"category": category, "cursor": first.headers["X-Next-Cursor"]})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+def test_cars_cursor_from_other_sort_is_rejected(client, auth_headers, category):
+    create_cars(client, auth_headers, category, [1000, 2000])
+    first = client.get("/api/v1/cars/", params={"category": category, "sort_by": "price", "limit": 1})
+
+    response = client.get(
+        "/api/v1/cars/",
+        params={"category": category, "sort_by": "rating", "limit": 1, "cursor": first.headers["X-Next-Cursor"]},
+    )
+
+    assert response.status_code == 400
+
+
+def test_cars_etag_returns_304_until_data_changes(client, auth_headers, category):
+    car_id = create_cars(client, auth_headers, category, [1000])[0]
+    etag = client.get("/api/v1/cars/", params={"category": category}).headers["ETag"]
+
+    not_modified = client.get("/api/v1/cars/", params={"category": category}, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+
+    client.patch(f"/api/v1/cars/{car_id}", json={"price": 1500}, headers=auth_headers)
+    changed = client.get("/api/v1/cars/", params={"category": category}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()[0]["price"] == 1500
+
+
+def test_cars_etag_sees_writes_outside_the_app(client, auth_headers, category):
+    from app.core.database import SessionLocal
+    from app.models.car import Car
+
+    car_id = create_cars(client, auth_headers, category, [1000])[0]
+    response = client.get(f"/api/v1/cars/{car_id}")
+    etag = response.headers["ETag"]
+
+    # Как create_user.py или миграция: своя сессия, мимо сервисов приложения
+    db = SessionLocal()
+    try:
+        db.get(Car, car_id).price = 2500
+        db.commit()
+    finally:
+        db.close()
+
+    changed = client.get(f"/api/v1/cars/{car_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["price"] == 2500
@@ -0,0 +1,38 @@
+"""
+Тесты стоимости bcrypt: калибровка сохраняется между запусками
+"""
+from app.core.config import settings
+from app.services import password
+from app.services.password import configure_password_hashing, password_hasher
+
+
+def test_calibrated_rounds_are_reused_after_restart(client, tmp_path, monkeypatch):
+    measured = iter([11, 12])
+
+    async def calibrate(target_ms, min_rounds, max_rounds):
+        rounds = next(measured)
+        password_hasher.configure_rounds(rounds)
+        return rounds
+
+    rounds = password_hasher.rounds
+    monkeypatch.setattr(settings, "PASSWORD_HASH_ROUNDS", 0)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_CALIBRATION_FILE", str(tmp_path / "rounds.json"))
+    monkeypatch.setattr(password_hasher, "calibrate", calibrate)
+    try:
+        assert client.portal.call(configure_password_hashing) == 11
+        # Повторный запуск: замер дал бы 12, но берется сохраненная стоимость
+        assert client.portal.call(configure_password_hashing) == 11
+        assert password_hasher.rounds == 11
+    finally:
+        password_hasher.configure_rounds(rounds)
+
+
+def test_stored_rounds_from_other_settings_are_ignored(tmp_path, monkeypatch):
+    path = str(tmp_path / "rounds.json")
+    password.store_calibrated_rounds(path, 11)
+
+    monkeypatch.setattr(settings, "PASSWORD_HASH_TARGET_MS", settings.PASSWORD_HASH_TARGET_MS * 2)
+    assert password.load_calibrated_rounds(path) is None
+
+    assert password.store_calibrated_rounds(path, 13) == 13
+    assert password.load_calibrated_rounds(path) == 13
@@ -0,0 +1,82 @@
+"""
+Тесты ограничения частоты запросов
+"""
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.rate_limit import (
+    InMemoryRateLimitStore,
+    RateLimiter,
+    RateLimitStore,
+    SQLiteRateLimitStore,
+    login_user_limiter,
+)
+
+
+def test_rate_limit_store_requires_take():
+    with pytest.raises(TypeError):
+        RateLimitStore()
+
+
+def test_in_memory_bucket_allows_capacity_then_limits():
+    store = InMemoryRateLimitStore(max_keys=10)
+
+    assert store.take("key", 2, 60.0) == 0
+    assert store.take("key", 2, 60.0) == 0
+    retry_after = store.take("key", 2, 60.0)
+
+    assert 0 < retry_after <= 30.0
+    assert store.take("other", 2, 60.0) == 0
+
+
+def test_sqlite_buckets_are_shared_between_stores(tmp_path):
+    path = str(tmp_path / "rate_limit.db")
+    first, second = SQLiteRateLimitStore(path), SQLiteRateLimitStore(path)
+    try:
+        assert first.take("key", 1, 60.0) == 0
+        assert second.take("key", 1, 60.0) > 0
+    finally:
+        first.close()
+        second.close()
+
+
+def test_blocking_store_runs_outside_event_loop(client, tmp_path):
+    threads = []
+
+    class RecordingStore(SQLiteRateLimitStore):
+        def take(self, key, capacity, period):
+            threads.append(threading.current_thread().name)
+            return super().take(key, capacity, period)
+
+    store = RecordingStore(str(tmp_path / "rate_limit.db"))
+    limiter = RateLimiter("test_blocking", "1/minute", store=store)
+
+    async def hit_twice():
+        await limiter.hit("key")
+        with pytest.raises(HTTPException) as exc_info:
+            await limiter.hit("key")
+        return exc_info.value
+
+    try:
+        error = client.portal.call(hit_twice)
+    finally:
+        store.close()
+
+    assert error.status_code == 429
+    assert all(name.startswith("bulkhead-file_io") for name in threads)
+
+
+def test_login_is_limited_per_username(client, create_user, login, monkeypatch):
+    username = create_user()
+    monkeypatch.setattr(login_user_limiter, "capacity", 2)
+
+    assert login(username, "wrong-password").status_code == 401
+    assert login(username, "wrong-password").status_code == 401
+    limited = login(username)
+
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= 1
+    # Лимит по имени пользователя не мешает другим пользователям
+    assert login(create_user()).status_code == 200
@@ -0,0 +1,81 @@
+"""
+Тесты раздачи загруженных файлов (/uploads)
+"""
+import gzip
+import os
+import uuid
+
+import pytest
+
+from app.core.config import settings
+
+
+def vary(response) -> set:
+    return {value.strip().lower() for value in response.headers.get("vary", "").split(",") if value.strip()}
+
+
+@pytest.fixture
+def uploaded_file():
+    """Файл в каталоге загрузок: uploaded_file(extension, content) -> публичный путь"""
+    paths = []
+
+    def _uploaded_file(extension: str, content: bytes) -> str:
+        name = f"{uuid.uuid4().hex}{extension}"
+        path = os.path.join(settings.UPLOAD_DIR, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        paths.append(path)
+        return f"/uploads/{name}"
+
+    yield _uploaded_file
+    for path in paths:
+        for suffix in ("", ".gz"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def test_uploads_are_cached_as_immutable(client, uploaded_file):
+    public_path = uploaded_file(".png", b"\x89PNG" + b"0" * 100)
+
+    response = client.get(public_path, headers={"Accept": "image/webp,image/*"})
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == f"public, max-age={settings.UPLOADS_CACHE_MAX_AGE}, immutable"
+    # Изображения не зависят от Accept: кеши прокси не дробятся по браузерам
+    assert "accept" not in vary(response)
+
+
+def test_uploads_support_range_requests(client, uploaded_file):
+    content = bytes(range(256)) * 4
+    public_path = uploaded_file(".jpg", content)
+
+    response = client.get(public_path, headers={"Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert response.content == content[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(content)}"
+
+
+def test_uploads_answer_not_modified(client, uploaded_file):
+    public_path = uploaded_file(".jpg", b"0" * 100)
+    etag = client.get(public_path).headers["etag"]
+
+    response = client.get(public_path, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert "immutable" in response.headers["cache-control"]
+
+
+def test_uploads_serve_precompressed_copy(client, uploaded_file):
+    content = b'{"key": "value"}' * 50
+    public_path = uploaded_file(".json", content)
+    with open(os.path.join(settings.UPLOAD_DIR, os.path.basename(public_path)) + ".gz", "wb") as f:
+        f.write(gzip.compress(content))
+
+    response = client.get(public_path, headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in vary(response)
+    assert response.content == content
@@ -0,0 +1,230 @@
+"""
+Тесты загрузки изображений автомобилей
+"""
+import functools
+import io
+import os
+import random
+import time
+
+from PIL import Image
+
+from app.core.config import settings
+from app.services.storage import StorageService, sweep_temp_uploads
+
+
+def png_bytes(color=None, size=(64, 48)) -> bytes:
+    """PNG случайного цвета: содержимое (и его хеш) у каждого теста свое"""
+    color = color or tuple(random.randrange(256) for _ in range(3))
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def upload_path(public_path: str) -> str:
+    return os.path.join(settings.UPLOAD_DIR, public_path.replace("/uploads/", ""))
+
+
+def upload_temp(client, headers, content: bytes) -> str:
+    response = client.post(
+        "/api/v1/cars/uploads/temp",
+        files=[("files", ("photo.png", content, "image/png"))],
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["uploaded"][0]
+
+
+def upload_car_image(client, headers, car_id: int, content: bytes) -> str:
+    response = client.post(
+        f"/api/v1/cars/{car_id}/images",
+        files=[("files", ("photo.png", content, "image/png"))],
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["uploaded"][0]
+
+
+def create_car(client, headers, images=None) -> dict:
+    response = client.post(
+        "/api/v1/cars/",
+        json={"name": "car", "price": 1000, "fuel_type": "gas", "images": images or []},
+        headers=headers,
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_create_car_with_temp_images_builds_variants(client, auth_headers):
+    temp_path = upload_temp(client, auth_headers, png_bytes())
+
+    car = create_car(client, auth_headers, [temp_path])
+
+    # Фоновая задача TestClient выполняется до возврата ответа: если запрос
+    # держит соединение-писатель, она ждет его до таймаута пула
+    assert car["images"] and "/uploads/temp/" not in car["images"][0]
+    response = client.get(f"/api/v1/cars/{car['id']}")
+    assert response.status_code == 200
+    assert response.json()["image_variants"][car["images"][0]]
+
+
+def test_identical_uploads_share_one_object(client, auth_headers):
+    content = png_bytes()
+    first = create_car(client, auth_headers)
+    second = create_car(client, auth_headers)
+
+    first_path = upload_car_image(client, auth_headers, first["id"], content)
+    second_path = upload_car_image(client, auth_headers, second["id"], content)
+
+    assert first_path == second_path
+    assert first_path.startswith("/uploads/cas/")
+    # Сам объект плюс жесткая ссылка из каталога каждого автомобиля
+    assert os.stat(upload_path(first_path)).st_nlink == 3
+
+
+def test_temp_reupload_reuses_file(client, auth_headers):
+    content = png_bytes()
+
+    assert upload_temp(client, auth_headers, content) == upload_temp(client, auth_headers, content)
+
+
+def test_object_removed_with_last_reference(client, auth_headers):
+    content = png_bytes()
+    first = create_car(client, auth_headers)
+    second = create_car(client, auth_headers)
+    public_path = upload_car_image(client, auth_headers, first["id"], content)
+    upload_car_image(client, auth_headers, second["id"], content)
+    object_path = upload_path(public_path)
+
+    assert client.delete(f"/api/v1/cars/{first['id']}", headers=auth_headers).status_code == 204
+    assert os.path.exists(object_path)
+    assert os.stat(object_path).st_nlink == 2
+
+    assert client.delete(f"/api/v1/cars/{second['id']}", headers=auth_headers).status_code == 204
+    assert not os.path.exists(object_path)
+
+
+def test_patch_images_drops_reference(client, auth_headers):
+    car = create_car(client, auth_headers)
+    public_path = upload_car_image(client, auth_headers, car["id"], png_bytes())
+
+    response = client.patch(f"/api/v1/cars/{car['id']}", json={"images": []}, headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+    assert not os.path.exists(upload_path(public_path))
+
+
+def make_temp_files(count: int, age_seconds: float = 0) -> list:
+    paths = []
+    for _ in range(count):
+        path = os.path.join(settings.TEMP_UPLOAD_DIR, f"sweep-{random.getrandbits(64):016x}.bin")
+        with open(path, "wb") as f:
+            f.write(b"x" * 10)
+        if age_seconds:
+            mtime = time.time() - age_seconds
+            os.utime(path, (mtime, mtime))
+        paths.append(path)
+    return paths
+
+
+def test_sweep_removes_only_expired_temp_files_in_one_pass(client):
+    fresh = make_temp_files(7)
+    expired = make_temp_files(5, age_seconds=7200)
+    entries_count = len(os.listdir(settings.TEMP_UPLOAD_DIR))
+
+    totals = client.portal.call(functools.partial(sweep_temp_uploads, ttl_seconds=3600, batch_size=3))
+
+    assert all(os.path.exists(path) for path in fresh)
+    assert not any(os.path.exists(path) for path in expired)
+    assert totals["deleted"] >= len(expired)
+    assert totals["freed_bytes"] >= 10 * len(expired)
+    # Каждая запись просматривается один раз, пачки продолжают друг друга
+    assert totals["scanned"] == entries_count
+    assert totals["batches"] == entries_count // 3 + 1
+
+
+def test_sweep_batch_scans_at_most_batch_size_entries(client):
+    make_temp_files(5)
+    storage_service = StorageService()
+    entries = storage_service.scan_temp_dir()
+    try:
+        first = storage_service.sweep_temp_files(entries, 3600, 2)
+        second = storage_service.sweep_temp_files(entries, 3600, 2)
+    finally:
+        entries.close()
+
+    assert first["scanned"] == second["scanned"] == 2
+    assert first["more"] == second["more"] == 1
+
+
+def test_image_paths_outside_storage_are_not_linked(client, auth_headers):
+    secret_path = os.path.join(os.path.dirname(os.path.abspath(settings.UPLOAD_DIR)), "secret.txt")
+    with open(secret_path, "w") as f:
+        f.write("secret")
+    car = create_car(client, auth_headers, ["/uploads/temp/../../secret.txt"])
+
+    response = client.patch(
+        f"/api/v1/cars/{car['id']}",
+        json={"images": ["/uploads/cas/../../secret.txt", "/uploads/cas/00/../../../secret.txt"]},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200, response.text
+    assert client.get(f"/uploads/{car['id']}/secret.txt").status_code == 404
+    assert os.path.exists(secret_path)
+    assert os.stat(secret_path).st_nlink == 1
+
+    response = client.patch(f"/api/v1/cars/{car['id']}", json={"images": []}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert os.path.exists(secret_path)
+
+
+def test_failed_upload_keeps_images_car_already_had(client, auth_headers, monkeypatch):
+    content = png_bytes()
+    car = create_car(client, auth_headers)
+    public_path = upload_car_image(client, auth_headers, car["id"], content)
+    ref_path = os.path.join(settings.UPLOAD_DIR, str(car["id"]), os.path.basename(public_path))
+
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", len(content) + 1)
+    response = client.post(
+        f"/api/v1/cars/{car['id']}/images",
+        files=[
+            ("files", ("same.png", content, "image/png")),
+            ("files", ("big.png", b"x" * (len(content) + 2), "image/png")),
+        ],
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 400
+    assert os.path.exists(upload_path(public_path))
+    assert os.path.exists(ref_path)
+
+
+def test_failed_temp_upload_keeps_earlier_temp_copy(client, auth_headers, monkeypatch):
+    content = png_bytes()
+    temp_path = upload_temp(client, auth_headers, content)
+
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", len(content) + 1)
+    response = client.post(
+        "/api/v1/cars/uploads/temp",
+        files=[
+            ("files", ("same.png", content, "image/png")),
+            ("files", ("big.png", b"x" * (len(content) + 2), "image/png")),
+        ],
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 400
+    assert os.path.exists(upload_path(temp_path))
+
+
+def test_car_created_with_existing_image_keeps_it(client, auth_headers):
+    first = create_car(client, auth_headers)
+    public_path = upload_car_image(client, auth_headers, first["id"], png_bytes())
+    second = create_car(client, auth_headers, [public_path])
+
+    assert client.delete(f"/api/v1/cars/{first['id']}", headers=auth_headers).status_code == 204
+
+    assert second["images"] == [public_path]
+    assert os.path.exists(upload_path(public_path))
+    assert client.get(public_path).status_code == 200